@@ -1,9 +1,17 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from pathlib import Path
-from model import Inputs, baseline_estimate, load_benchmarks
+import csv, gzip, hashlib, io, json, threading
+from model import Inputs, baseline_estimate_batch, BENCHMARKS, PREDICTIONS
+from scrapers import db
+
+try:
+    import brotli  # optional; gzip is always offered
+except ImportError:
+    brotli = None
 
 ROOT = Path(__file__).parent
 
@@ -21,32 +29,89 @@ class PredictIn(BaseModel):
     equipped_ops: Optional[float] = 0
     sqft: Optional[float] = 0
 
-@app.get("/api/health")
-def health():
-    return {"ok": True, "version": "1.0"}
+class PredictBatchIn(BaseModel):
+    items: List[PredictIn]
 
-@app.post("/api/predict")
-def predict(body: PredictIn):
-    x = Inputs(
+MAX_BATCH = 100_000
+
+def _inputs(body: PredictIn) -> Inputs:
+    return Inputs(
         province=(body.province or "ON").upper(),
         collections=body.collections or 0,
         ebitda_or_sde=body.ebitda_or_sde or 0,
         equipped_ops=body.equipped_ops or 0,
         sqft=body.sqft or 0,
     )
-    return baseline_estimate(x)
+
+def _etag(*parts) -> str:
+    return '"' + hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:20] + '"'
+
+def _not_modified(request: Request, etag: str) -> bool:
+    return etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]
+
+@app.get("/api/health")
+def health():
+    return {"ok": True, "version": "1.0", "prediction_cache": PREDICTIONS.stats()}
+
+@app.post("/api/predict")
+def predict(body: PredictIn):
+    return PREDICTIONS.estimate(_inputs(body))
+
+@app.post("/api/predict/batch")
+def predict_batch(body: PredictBatchIn):
+    if len(body.items) > MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"at most {MAX_BATCH} items per batch")
+    return {"results": baseline_estimate_batch([_inputs(b) for b in body.items])}
+
+BENCH_CACHE_CONTROL = "public, max-age=300"
+_bench_cache: dict = {}  # (version, province) -> {"": (body, etag), "gzip": ..., "br": ...}
+_bench_lock = threading.Lock()
+
+def _bench_entry(province: Optional[str]) -> dict:
+    """Pre-serialized (and pre-compressed) benchmark response for the current data version."""
+    BENCHMARKS.refresh()
+    version = BENCHMARKS.version
+    key = (version, province.upper() if province else None)
+    entry = _bench_cache.get(key)
+    if entry is not None:
+        return entry
+    with _bench_lock:
+        if any(v != version for v, _ in _bench_cache):
+            _bench_cache.clear()  # benchmarks reloaded: every cached body is stale
+        rows = BENCHMARKS.rows(province)
+        body = json.dumps({"rows": rows}, separators=(",", ":")).encode()
+        tag = hashlib.sha256(body).hexdigest()[:24]
+        entry = {"": (body, f'"{tag}"'), "gzip": (gzip.compress(body, 9), f'"{tag}-gz"')}
+        if brotli is not None:
+            entry["br"] = (brotli.compress(body), f'"{tag}-br"')
+        if rows or not province:  # don't let arbitrary unknown provinces grow the cache
+            _bench_cache[key] = entry
+    return entry
+
+def _pick_encoding(request: Request, entry: dict) -> str:
+    accepted = {p.split(";")[0].strip() for p in request.headers.get("accept-encoding", "").split(",")}
+    for enc in ("br", "gzip"):
+        if enc in accepted and enc in entry:
+            return enc
+    return ""
 
 @app.get("/api/benchmarks")
-def benchmarks(province: Optional[str] = None):
-    df = load_benchmarks()
-    if province:
-        df = df[df["province"] == province.upper()]
-    return {"rows": df.to_dict(orient="records")}
+def benchmarks(request: Request, province: Optional[str] = None):
+    entry = _bench_entry(province)
+    enc = _pick_encoding(request, entry)
+    body, etag = entry[enc]
+    headers = {"ETag": etag, "Cache-Control": BENCH_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    if enc:
+        headers["Content-Encoding"] = enc
+    return Response(body, media_type="application/json", headers=headers)
 
 # ===== Scheduler & Scraper Integration =====
 import os
 from apscheduler.schedulers.background import BackgroundScheduler
 from scrapers import run_all_scrapers
+from scrapers.run import SCRAPED_CSV, APPRAISAL_CSV
 
 scheduler: BackgroundScheduler = None
 
@@ -65,12 +130,61 @@ def _maybe_start_scheduler():
     if os.getenv("RUN_SCHEDULER", "0") == "1":
         start_scheduler()
 
+@app.on_event("startup")
+def _seed_db():
+    # existing deployments: bring the CSV/Parquet history into an empty database once
+    db.seed_from_history(SCRAPED_CSV, APPRAISAL_CSV)
+
+MAX_PAGE = 1000
+STREAM_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+def _csv_lines(rows, fields):
+    buf = io.StringIO()
+    out = csv.writer(buf)
+    out.writerow(fields)
+    for i, r in enumerate(rows, 1):
+        out.writerow(["" if r[k] is None else r[k] for k in fields])
+        if i % 500 == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
 @app.get("/api/scraped")
-def scraped():
-    import pandas as pd
-    from pathlib import Path
-    path = Path(__file__).parent / "data" / "scraped_listings.csv"
-    if not path.exists():
-        return {"rows": []}
-    df = pd.read_csv(path)
-    return {"rows": df.tail(200).to_dict(orient="records")}  # last 200 for brevity
+def scraped(request: Request,
+            broker: Optional[str] = None, province: Optional[str] = None,
+            min_price: Optional[float] = None, max_price: Optional[float] = None,
+            since: Optional[str] = None, until: Optional[str] = None,
+            fields: Optional[str] = Query(None, description="comma-separated columns"),
+            cursor: Optional[str] = None, limit: Optional[int] = Query(None, ge=1),
+            format: str = Query("json", pattern="^(json|ndjson|csv)$")):
+    """Listings newest first. JSON is paged (`next_cursor`); ndjson/csv stream every match."""
+    cols = [f.strip() for f in fields.split(",") if f.strip()] if fields else list(db.LISTING_COLUMNS)
+    unknown = set(cols) - set(db.LISTING_COLUMNS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"unknown fields: {', '.join(sorted(unknown))}")
+    if cursor:
+        try:
+            db.decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="bad cursor")
+    filters = dict(broker=broker, province=province, min_price=min_price, max_price=max_price,
+                   since=since, until=until)
+
+    # the listings write counter changes on every upsert, so (counter, query) names the response
+    etag = _etag(db.version("listings"), filters, cols, cursor, limit, format)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    if format == "json":
+        rows, nxt = db.listings_page(cols, cursor, min(limit or 200, MAX_PAGE), **filters)
+        return Response(json.dumps({"rows": rows, "next_cursor": nxt}), media_type="application/json",
+                        headers=headers)
+
+    rows = db.iter_listings(cols, cursor, limit, **filters)
+    if format == "csv":
+        body = _csv_lines(rows, cols)
+    else:
+        body = (json.dumps(r) + "\n" for r in rows)
+    return StreamingResponse(body, media_type=STREAM_TYPES[format], headers=headers)
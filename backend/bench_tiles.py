@@ -0,0 +1,57 @@
+"""Time TierThree archive tile extraction as saved archive pages grow.
+
+Each page's <body> is repeated 1..32 times (listing URLs made unique per
+copy) and parsed with scrapers.tierthree.archive_tiles. Linear work shows up
+as a flat ms/100KB column and a log-log slope near 1.
+
+    python bench_tiles.py                 # archived TierThree pages, else debug_out/*.html
+    python bench_tiles.py page1.html ...
+"""
+import math, re, sys, time
+from pathlib import Path
+
+from scrapers.archive import ARCHIVE
+from scrapers.tierthree import ARCHIVE as ARCHIVE_URL, archive_tiles
+
+SCALES = (1, 2, 4, 8, 16, 32)
+REPEAT = 5
+
+def saved_pages():
+    if sys.argv[1:]:
+        return [(p, Path(p).read_text(encoding="utf-8", errors="replace")) for p in sys.argv[1:]]
+    pages = [(u, ARCHIVE.rendered(u)) for u in sorted(ARCHIVE.urls()) if u.startswith(ARCHIVE_URL)]
+    pages = [(u, html) for u, html in pages if html]
+    return pages or [(str(p), p.read_text(encoding="utf-8", errors="replace"))
+                     for p in sorted(Path("debug_out").glob("*.html"))]
+
+def scaled(html: str, k: int) -> str:
+    head, sep, rest = html.partition("<body")
+    if not sep:
+        return html * k
+    open_end = rest.index(">") + 1
+    body, _, tail = rest[open_end:].partition("</body>")
+    copies = (re.sub(r'(/listings/[^"\'/?#]+)', rf"\1-{n}", body) for n in range(k))
+    return f"{head}<body{rest[:open_end]}{''.join(copies)}</body>{tail}"
+
+def best_ms(html, url) -> tuple:
+    best = float("inf")
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        rows = archive_tiles(html, url)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e3, len(rows)
+
+if __name__ == "__main__":
+    for name, html in saved_pages():
+        url = name if name.startswith("http") else ARCHIVE_URL
+        print(f"\n{name}")
+        print(f"{'x':>4} {'KB':>8} {'tiles':>6} {'ms':>9} {'ms/100KB':>9}")
+        points = []
+        for k in SCALES:
+            page = scaled(html, k)
+            ms, tiles = best_ms(page, url)
+            kb = len(page) / 1024
+            points.append((kb, ms))
+            print(f"{k:>4} {kb:>8.0f} {tiles:>6} {ms:>9.2f} {100 * ms / kb:>9.2f}")
+        (kb0, ms0), (kb1, ms1) = points[0], points[-1]
+        print(f"log-log slope {math.log(ms1 / ms0) / math.log(kb1 / kb0):.2f} (1.0 = linear)")
@@ -1,7 +1,12 @@
 from __future__ import annotations
 from dataclasses import dataclass
+import csv
 import math
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
 DATA_DIR = Path(__file__).parent / "data"
@@ -30,6 +35,88 @@ def load_benchmarks() -> pd.DataFrame:
     df["province"] = df["province"].astype(str).str.upper()
     return df
 
+def _typed_column(values):
+    """Coerce a CSV column the way read_csv would: all-int, else all-float, else str."""
+    present = [v for v in values if v != ""]
+    for cast in (int, float):
+        try:
+            [cast(v) for v in present]
+        except ValueError:
+            continue
+        return [cast(v) if v != "" else None for v in values]
+    return [v if v != "" else None for v in values]
+
+class BenchmarkStore:
+    """Benchmarks kept in memory and indexed by province.
+
+    The CSV is only re-read when its mtime or size changes, so lookups on the
+    request path cost a stat() and a dict access.
+    """
+
+    def __init__(self, path: Path = BENCHMARKS_CSV):
+        self.path = Path(path)
+        self.version = 0
+        self._sig = None
+        self._rows: list[dict] = []
+        self._by_prov: dict[str, list[dict]] = {}
+        self._lock = threading.Lock()
+
+    def _signature(self):
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self):
+        with open(self.path, newline="", encoding="utf-8") as fh:
+            raw = list(csv.DictReader(fh))
+        if not raw:
+            return []
+        cols = {k: _typed_column([r.get(k) or "" for r in raw]) for k in raw[0].keys()}
+        rows = [{k: cols[k][i] for k in cols} for i in range(len(raw))]
+        for r in rows:
+            r["province"] = str(r.get("province") or "").upper()
+        return rows
+
+    def refresh(self):
+        sig = self._signature()
+        if sig == self._sig:
+            return
+        with self._lock:
+            if sig == self._sig:
+                return
+            rows = self._load() if sig else []
+            by_prov: dict[str, list[dict]] = {}
+            for r in rows:
+                by_prov.setdefault(r["province"], []).append(r)
+            self._rows, self._by_prov, self._sig = rows, by_prov, sig
+            self.version += 1
+
+    def rows(self, province: str | None = None) -> list[dict]:
+        self.refresh()
+        if province:
+            return list(self._by_prov.get(province.upper(), []))
+        return list(self._rows)
+
+    def get(self, province: str) -> dict | None:
+        self.refresh()
+        hits = self._by_prov.get(str(province).upper())
+        return hits[0] if hits else None
+
+BENCHMARKS = BenchmarkStore()
+
+def _prov_multiple(province) -> float:
+    """Provincial EBITDA multiple, or NaN when the province has no usable benchmark."""
+    try:
+        row = BENCHMARKS.get(province)
+        return float(row["ebitda_multiple"]) if row is not None else math.nan
+    except Exception:
+        return math.nan
+
+# error band by number of filled fields (index 0 = nothing filled)
+_ERR_BY_FILLED = {1: 0.28, 2: 0.22, 3: 0.16, 4: 0.12}
+
 def baseline_estimate(x: Inputs) -> dict:
     # Inputs with safe defaults
     c = _f(x.collections)
@@ -59,19 +146,14 @@ def baseline_estimate(x: Inputs) -> dict:
     est = base * (1.0 + cap_adj + space_adj)
 
     # Provincial multiple blend (pulls toward bench multiple * EBITDA)
-    try:
-        bm = load_benchmarks()
-        row = bm[bm["province"] == x.province.upper()].head(1)
-        if not row.empty and e > 0:
-            prov_mult = float(row["ebitda_multiple"].iloc[0])
-            prov_est = prov_mult * e
-            est = 0.7 * est + 0.3 * prov_est
-    except Exception:
-        pass
+    prov_mult = _prov_multiple(x.province)
+    if not math.isnan(prov_mult) and e > 0:
+        prov_est = prov_mult * e
+        est = 0.7 * est + 0.3 * prov_est
 
     # Uncertainty shrinks as more fields filled
     filled = sum([c > 0, e > 0, ops > 0, sqft > 0])
-    err = {1: 0.28, 2: 0.22, 3: 0.16, 4: 0.12}.get(filled, 0.30)
+    err = _ERR_BY_FILLED.get(filled, 0.30)
 
     lo68, hi68 = est * (1 - err/2), est * (1 + err/2)
     lo95, hi95 = est * (1 - err),   est * (1 + err)
@@ -90,3 +172,123 @@ def baseline_estimate(x: Inputs) -> dict:
             "space_adj": round(space_adj, 4),
         },
     }
+
+def baseline_estimate_batch(xs: list[Inputs]) -> list[dict]:
+    """Vectorized baseline_estimate over many inputs; results come back in input order.
+
+    Same arithmetic (and operation order) as the scalar path so the numbers match
+    exactly; only the final dict assembly is a Python loop.
+    """
+    n = len(xs)
+    if n == 0:
+        return []
+
+    def col(attr):
+        return np.fromiter((_f(getattr(x, attr)) for x in xs), dtype=float, count=n)
+
+    c = col("collections")
+    e = col("ebitda_or_sde")
+    e = np.where((e <= 0) & (c > 0), 0.25 * c, e)
+    ops = np.maximum(col("equipped_ops"), 1.0)
+    sqft = np.maximum(col("sqft"), 1.0)
+
+    base = np.maximum(0.80 * c, 3.8 * e)
+    cap_adj = np.minimum(0.12, 0.015 * np.maximum(0.0, ops - 4.0))
+    sqft_per_op = sqft / ops
+    space_adj = np.where(sqft_per_op < 260, 0.03, np.where(sqft_per_op > 330, -0.03, 0.0))
+    est = base * (1.0 + cap_adj + space_adj)
+
+    # one benchmark lookup per distinct province
+    BENCHMARKS.refresh()
+    mults = {p: _prov_multiple(p) for p in {x.province for x in xs}}
+    prov_mult = np.fromiter((mults[x.province] for x in xs), dtype=float, count=n)
+    blend = ~np.isnan(prov_mult) & (e > 0)
+    est = np.where(blend, 0.7 * est + 0.3 * (prov_mult * e), est)
+
+    filled = (c > 0).astype(int) + (e > 0) + (ops > 0) + (sqft > 0)
+    err = np.array([_ERR_BY_FILLED.get(k, 0.30) for k in range(5)])[filled]
+    lo68, hi68 = est * (1 - err/2), est * (1 + err/2)
+    lo95, hi95 = est * (1 - err),   est * (1 + err)
+
+    out = []
+    cols = zip(est.tolist(), lo68.tolist(), hi68.tolist(), lo95.tolist(), hi95.tolist(),
+               c.tolist(), e.tolist(), ops.tolist(), sqft.tolist(), sqft_per_op.tolist(),
+               cap_adj.tolist(), space_adj.tolist())
+    for est_i, l68, h68, l95, h95, c_i, e_i, ops_i, sqft_i, spo, cap, space in cols:
+        out.append({
+            "estimate": round(est_i),
+            "range_68": [round(l68), round(h68)],
+            "range_95": [round(l95), round(h95)],
+            "details": {
+                "collections": c_i,
+                "ebitda_or_sde": e_i,
+                "equipped_ops": ops_i,
+                "sqft": sqft_i,
+                "sqft_per_op": round(spo, 1),
+                "capacity_adj": round(cap, 4),
+                "space_adj": round(space, 4),
+            },
+        })
+    return out
+
+class PredictionCache:
+    """Bounded LRU (with TTL) of baseline_estimate results.
+
+    Keys are the inputs as the estimator sees them (after `_f` and province
+    upper-casing) plus BENCHMARKS.version, so a benchmark reload invalidates
+    every entry without any explicit hook.
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl_s: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self._data: OrderedDict = OrderedDict()  # key -> (stored_at, result)
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.expired = 0
+
+    @staticmethod
+    def normalize(x: Inputs) -> Inputs:
+        # + 0.0 folds -0.0 into 0.0 so both share an entry
+        return Inputs(str(x.province or "").upper(), _f(x.collections) + 0.0, _f(x.ebitda_or_sde) + 0.0,
+                      _f(x.equipped_ops) + 0.0, _f(x.sqft) + 0.0)
+
+    @staticmethod
+    def _copy(r: dict) -> dict:
+        return {**r, "range_68": list(r["range_68"]), "range_95": list(r["range_95"]),
+                "details": dict(r["details"])}
+
+    def estimate(self, x: Inputs) -> dict:
+        BENCHMARKS.refresh()
+        n = self.normalize(x)
+        key = (BENCHMARKS.version, n.province, n.collections, n.ebitda_or_sde, n.equipped_ops, n.sqft)
+        now = time.monotonic()
+        with self._lock:
+            if self._version != BENCHMARKS.version:
+                self._data.clear()  # entries for the old benchmarks can never be hit again
+                self._version = BENCHMARKS.version
+            hit = self._data.get(key)
+            if hit is not None:
+                if now - hit[0] <= self.ttl_s:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return self._copy(hit[1])
+                del self._data[key]
+                self.expired += 1
+            self.misses += 1
+        result = baseline_estimate(n)
+        with self._lock:
+            self._data[key] = (now, result)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return self._copy(result)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits,
+                    "misses": self.misses, "expired": self.expired,
+                    "hit_rate": round(self.hits / total, 4) if total else 0.0}
+
+PREDICTIONS = PredictionCache()
@@ -1,5 +1,7 @@
-from selectolax.parser import HTMLParser
 import re
+from .extract import AliasMatcher, SANITY_RANGES, extract_labeled, find_near
+from .document import ParsedDoc, as_doc
+from .structured import embedded_fields, complete
 
 def _to_num(s: str):
     if not s: return None
@@ -32,90 +34,21 @@ LABEL_ALIASES = {
     "sqft":          ["square feet", "sq ft", "sqft", "area", "size"],
 }
 
-def _match_label(text: str, target_list):
-    t = text.strip().lower()
-    for key in target_list:
-        if key in t:
-            return True
-    return False
+MATCHER = AliasMatcher(LABEL_ALIASES)
+# floors for values taken from structured metadata (the proximity search applies the same ones)
+RANGES = {**SANITY_RANGES, "asking_price": (10000, None), "collections": (100000, None), "ebitda_or_sde": (50000, None)}
 
-def _neighbors_text(node):
-    """Text of node plus immediate next sibling(s) to catch 'Label' + 'Value' patterns."""
-    bits = [node.text(strip=True)]
-    sib = node.next
-    if sib:
-        bits.append(sib.text(strip=True))
-    # sometimes value is in the parent then a span/div
-    if node.parent:
-        children = node.parent.css("span,div,dd,td")
-        for ch in children[:3]:
-            bits.append(ch.text(strip=True))
-    return " | ".join([b for b in bits if b])
+def _dom_value(field, source, label, value):
+    return _to_num(value or label)
 
-def _extract_by_dom(root: HTMLParser):
-    out = {k: None for k in LABEL_ALIASES.keys()}
-
-    # 1) try definition lists (dl/dt/dd)
-    for dl in root.css("dl"):
-        dts = dl.css("dt")
-        dds = dl.css("dd")
-        for i, dt in enumerate(dts):
-            label = dt.text(strip=True)
-            if not label: continue
-            valtxt = ""
-            if i < len(dds):
-                valtxt = dds[i].text(strip=True)
-            for field, aliases in LABEL_ALIASES.items():
-                if _match_label(label, aliases):
-                    if field in ("equipped_ops",):
-                        num = _to_num(valtxt or label)
-                    else:
-                        num = _to_num(valtxt or label)
-                    if field == "sqft" and num and (num < 350 or num > 12000): num = None
-                    if field == "equipped_ops" and num and (num < 1 or num > 25): num = None
-                    if out[field] is None and num is not None:
-                        out[field] = num
-
-    # 2) try tables
-    for row in root.css("table tr"):
-        cells = row.css("th,td")
-        if len(cells) >= 2:
-            label = cells[0].text(strip=True)
-            value = cells[1].text(strip=True)
-            for field, aliases in LABEL_ALIASES.items():
-                if _match_label(label, aliases):
-                    num = _to_num(value or label)
-                    if field == "sqft" and num and (num < 350 or num > 12000): num = None
-                    if field == "equipped_ops" and num and (num < 1 or num > 25): num = None
-                    if out[field] is None and num is not None:
-                        out[field] = num
-
-    # 3) generic label elements: strong/b tags or labels preceding values
-    for lab in root.css("strong, b, th, .label, .listing__label, .et_pb_text_inner strong"):
-        label = lab.text(strip=True)
-        if not label: continue
-        bundle = _neighbors_text(lab)
-        for field, aliases in LABEL_ALIASES.items():
-            if _match_label(label, aliases):
-                num = _to_num(bundle)
-                if field == "sqft" and num and (num < 350 or num > 12000): num = None
-                if field == "equipped_ops" and num and (num < 1 or num > 25): num = None
-                if out[field] is None and num is not None:
-                    out[field] = num
+def _extract_by_dom(doc: ParsedDoc):
+    # 1-3) dl pairs, table rows, then strong/b/label nodes with their neighbours, in one DOM walk
+    out = extract_labeled(doc.root, MATCHER, _dom_value, sources=("dl", "table", "label"))
 
     # 4) fallback: full-text proximity search (last resort)
-    full = root.text(separator=' ').strip()
+    full = doc.text
     def near(keywords, minv=None):
-        t = full.lower()
-        for kw in keywords:
-            i = t.find(kw)
-            if i != -1:
-                lo = max(0, i-24); hi = min(len(t), i+len(kw)+140)
-                sub = full[lo:hi]
-                n = _to_num(sub)
-                if n and (minv is None or n >= minv):
-                    return n
-        return None
+        return find_near(doc, keywords, before=24, after=140, lo=minv, stops=MATCHER.aliases)
 
     if out["asking_price"] is None:
         out["asking_price"] = near(LABEL_ALIASES["asking_price"], 10000)
@@ -139,12 +72,13 @@ def _extract_by_dom(root: HTMLParser):
 
     return out
 
-def parse_roi_detail(html: str):
-    root = HTMLParser(html)
-    fields = _extract_by_dom(root)
-    prov = _guess_province(root.text(separator=' '))
-    fields["province"] = prov
+def parse_roi_detail(html, url: str = ""):
+    doc = as_doc(html, url)
+    # JSON-LD / microdata / OpenGraph first; the DOM only fills what they lack
+    known = embedded_fields(doc, MATCHER, RANGES)
+    fields = dict(known) if complete(known, MATCHER) else {**_extract_by_dom(doc), **known}
+    fields["province"] = known.get("province") or _guess_province(doc.text)
     # also try to catch explicit "Appraised Value" if present, for later QC
-    m = re.search(r'Appraised Value\s*[:\-]?\s*\$?\s*([\d,\.]+)', root.text(separator=' '), re.I)
+    m = re.search(r'Appraised Value\s*[:\-]?\s*\$?\s*([\d,\.]+)', doc.text, re.I)
     fields["appraised_value"] = _to_num(m.group(1)) if m else None
     return fields
@@ -1,6 +1,8 @@
-from selectolax.parser import HTMLParser
 import re
 from urllib.parse import urlparse
+from .extract import AliasMatcher, SANITY_RANGES, extract_labeled
+from .document import as_doc
+from .structured import embedded_fields, complete
 
 def _num_plain(s: str):
     if not s: return None
@@ -55,87 +57,33 @@ LABELS = {
     "sqft":          ["premises size","square feet","sq ft","sqft","area","size"],
 }
 
-def _match(label: str, options):
-    t = (label or "").strip().lower()
-    return any(k in t for k in options)
-
-def _neighbors_bundle(node):
-    bits = [node.text(strip=True)]
-    if node.next: bits.append(node.next.text(strip=True))
-    if node.parent:
-        for ch in node.parent.css("span,div,dd,td"):
-            txt = ch.text(strip=True)
-            if txt: bits.append(txt)
-    return " ".join(bits)
-
-def parse_tierthree_detail(html: str, url: str = ""):
-    root = HTMLParser(html)
-    out = {k: None for k in LABELS}
-
-    # 1) Elementor “listing facts” often appear in definition lists or info blocks
-    # DL blocks
-    for dl in root.css("dl"):
-        dts, dds = dl.css("dt"), dl.css("dd")
-        for i, dt in enumerate(dts):
-            label = dt.text(strip=True)
-            val = dds[i].text(strip=True) if i < len(dds) else ""
-            for fld, aliases in LABELS.items():
-                if _match(label, aliases):
-                    if fld in ("asking_price","collections","ebitda_or_sde"):
-                        if not (_money_present(label) or _money_present(val)):
-                            continue
-                        num = _num_money(val or label)
-                    elif fld == "equipped_ops":
-                        num = _num_plain(val or label)
-                    else:
-                        num = _num_plain(val or label)
-                    if fld == "sqft" and num and not (350 <= num <= 12000): num = None
-                    if fld == "equipped_ops" and num and not (1 <= num <= 25): num = None
-                    if out[fld] is None and num is not None:
-                        out[fld] = num
-
-    # 2) Tables
-    for tr in root.css("table tr"):
-        tds = tr.css("th,td")
-        if len(tds) >= 2:
-            label = tds[0].text(strip=True)
-            val = tds[1].text(strip=True)
-            for fld, aliases in LABELS.items():
-                if _match(label, aliases):
-                    if fld in ("asking_price","collections","ebitda_or_sde"):
-                        if not (_money_present(label) or _money_present(val)):
-                            continue
-                        num = _num_money(val or label)
-                    elif fld == "equipped_ops":
-                        num = _num_plain(val or label)
-                    else:
-                        num = _num_plain(val or label)
-                    if fld == "sqft" and num and not (350 <= num <= 12000): num = None
-                    if fld == "equipped_ops" and num and not (1 <= num <= 25): num = None
-                    if out[fld] is None and num is not None:
-                        out[fld] = num
-
-    # 3) Elementor “icon-list” pattern (common on TT)
-    for li in root.css(".elementor-icon-list-item, .elementor-widget-text-editor li, li"):
-        text = li.text(separator=' ', strip=True) or ""
-        for fld, aliases in LABELS.items():
-            if _match(text, aliases):
-                if fld in ("asking_price","collections","ebitda_or_sde"):
-                    if not _money_present(text): 
-                        continue
-                    num = _num_money(text)
-                elif fld == "equipped_ops":
-                    m = re.search(r'(\d{1,2})\s*(?:ops|operatories|operatory|chairs|treatment rooms)', text, re.I)
-                    num = _num_plain(m.group(1)) if m else None
-                else:
-                    num = _num_plain(text)
-                if fld == "sqft" and num and not (350 <= num <= 12000): num = None
-                if fld == "equipped_ops" and num and not (1 <= num <= 25): num = None
-                if out[fld] is None and num is not None:
-                    out[fld] = num
+MONEY_FIELDS = ("asking_price", "collections", "ebitda_or_sde")
+RX_OPS_COUNT = re.compile(r'(\d{1,2})\s*(?:ops|operatories|operatory|chairs|treatment rooms)', re.I)
+# money floors on top of the shared sqft/ops ranges
+RANGES = {**SANITY_RANGES, "collections": (100000, None), "ebitda_or_sde": (50000, None)}
+MATCHER = AliasMatcher(LABELS)
+
+def _dom_value(fld, source, label, val):
+    if source == "li":
+        # Elementor "icon-list" items carry label and value in one text run
+        if fld in MONEY_FIELDS:
+            return _num_money(label) if _money_present(label) else None
+        if fld == "equipped_ops":
+            m = RX_OPS_COUNT.search(label)
+            return _num_plain(m.group(1)) if m else None
+        return _num_plain(label)
+    if fld in MONEY_FIELDS:
+        if not (_money_present(label) or _money_present(val)):
+            return None
+        return _num_money(val or label)
+    return _num_plain(val or label)
+
+def _extract_by_dom(doc):
+    # 1-3) DL blocks, tables, then Elementor icon-list / li items, in one DOM walk
+    out = extract_labeled(doc.root, MATCHER, _dom_value, sources=("dl", "table", "li"), ranges=RANGES)
 
     # 4) Fallback proximity (still require $/CAD or K/M for money)
-    full = root.text(separator=" ").strip()
+    full = doc.text
     if out["equipped_ops"] is None:
         m = re.search(r'(?:ops|operatories|operatory|chairs|treatment rooms)\D{0,12}(\d{1,2})', full, re.I)
         if m:
@@ -146,13 +94,15 @@ def parse_tierthree_detail(html: str, url: str = ""):
         if m:
             n = _num_plain(m.group(1))
             if n and 350 <= n <= 12000: out["sqft"] = n
+    return out
+
+def parse_tierthree_detail(html, url: str = ""):
+    doc = as_doc(html, url)
+    # JSON-LD / microdata / OpenGraph first; the DOM only fills what they lack
+    known = embedded_fields(doc, MATCHER, RANGES)
+    out = dict(known) if complete(known, MATCHER) else {**_extract_by_dom(doc), **known}
 
     # Province — URL takes precedence
     p_url = _prov_from_url(url or "")
-    p_txt = _prov_from_text(full)
-    out["province"] = p_url or p_txt or ""
-    # Minimums for money
-    if out["collections"] is not None and out["collections"] < 100000: out["collections"] = None
-    if out["ebitda_or_sde"] is not None and out["ebitda_or_sde"] < 50000: out["ebitda_or_sde"] = None
-
+    out["province"] = p_url or known.get("province") or _prov_from_text(doc.text) or ""
     return out
@@ -0,0 +1,106 @@
+"""Content-addressed archive of every page body fetched during a scraper run.
+
+Blobs are gzip files under data/archive/blobs/<2 hex>/<sha256>.gz, so a page
+that hasn't changed is stored once. data/archive/index.jsonl is append-only:
+one {url, kind, hash, content_type, fetched_at} line whenever a URL's body
+changes. `kind` is "static" (plain GET) or "rendered" (Chromium HTML).
+
+In replay mode the fetchers in utils.py / browser.py answer from the archive
+instead of the network; see scrapers/replay.py.
+"""
+import gzip, hashlib, json, threading
+from datetime import datetime, timezone
+
+import httpx
+
+from .utils import DATA_DIR
+
+ARCHIVE_DIR = DATA_DIR / "archive"
+
+class Archive:
+    def __init__(self, root=ARCHIVE_DIR):
+        self.root = root
+        self.replaying = False
+        self._latest = None  # (url, kind) -> index record
+        self._lock = threading.Lock()
+
+    @property
+    def index_path(self):
+        return self.root / "index.jsonl"
+
+    def _blob_path(self, digest: str):
+        return self.root / "blobs" / digest[:2] / f"{digest}.gz"
+
+    def _index(self) -> dict:
+        if self._latest is None:
+            latest = {}
+            try:
+                with self.index_path.open(encoding="utf-8") as fh:
+                    for line in fh:
+                        try:
+                            rec = json.loads(line)
+                        except ValueError:
+                            continue  # torn last line from an interrupted run
+                        latest[(rec["url"], rec["kind"])] = rec
+            except OSError:
+                pass
+            self._latest = latest
+        return self._latest
+
+    def put(self, url: str, kind: str, body, content_type: str = ""):
+        """Record one fetched body (bytes or str). No-op while replaying."""
+        if self.replaying or body is None:
+            return
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        digest = hashlib.sha256(data).hexdigest()
+        blob = self._blob_path(digest)
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            tmp = blob.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp.write_bytes(gzip.compress(data, compresslevel=6))
+            tmp.replace(blob)
+        with self._lock:
+            latest = self._index()
+            prev = latest.get((url, kind))
+            if prev is not None and prev["hash"] == digest:
+                return
+            rec = {"url": url, "kind": kind, "hash": digest, "content_type": content_type,
+                   "fetched_at": datetime.now(timezone.utc).isoformat()}
+            latest[(url, kind)] = rec
+            with self.index_path.open("a", encoding="utf-8") as fh:
+                fh.write(json.dumps(rec) + "\n")
+
+    def get(self, url: str, kind: str):
+        """Latest (bytes, content_type) stored for url/kind, or None."""
+        with self._lock:
+            rec = self._index().get((url, kind))
+        if rec is None:
+            return None
+        try:
+            return gzip.decompress(self._blob_path(rec["hash"]).read_bytes()), rec.get("content_type") or ""
+        except OSError:
+            return None
+
+    def response(self, url: str):
+        """The archived plain-GET body as an httpx.Response, or None."""
+        hit = self.get(url, "static")
+        if hit is None:
+            return None
+        data, ctype = hit
+        return httpx.Response(200, content=data, headers={"content-type": ctype} if ctype else {},
+                              request=httpx.Request("GET", url))
+
+    def rendered(self, url: str):
+        """Archived Chromium HTML for url (falling back to the plain GET body), or None."""
+        hit = self.get(url, "rendered") or self.get(url, "static")
+        return hit[0].decode("utf-8", "replace") if hit else None
+
+    def urls(self) -> dict:
+        """url -> {kind: fetched_at} for everything archived."""
+        out = {}
+        with self._lock:
+            for (url, kind), rec in self._index().items():
+                out.setdefault(url, {})[kind] = rec["fetched_at"]
+        return out
+
+ARCHIVE = Archive()
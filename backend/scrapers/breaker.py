@@ -0,0 +1,109 @@
+"""Per-host circuit breaker, persisted in data/host_health.json between runs.
+
+A host that fails FAILURE_THRESHOLD times in a row (connection errors,
+timeouts, 5xx) is skipped until its backoff expires; the backoff doubles on
+every further failure, from BASE_BACKOFF_S up to MAX_BACKOFF_S. Once it
+expires the next request is a trial: success forgets the host, failure
+re-opens the circuit for twice as long. Any answer below 500 (a 404 included)
+counts as the host being up.
+"""
+import json, threading, time
+
+import httpx
+
+from .utils import DATA_DIR, hostname
+
+HEALTH_JSON = DATA_DIR / "host_health.json"
+
+FAILURE_THRESHOLD = 3
+BASE_BACKOFF_S = 15 * 60
+MAX_BACKOFF_S = 24 * 3600
+# Chromium network errors meaning the host is unreachable; Playwright raises
+# them as its plain Error ("net::ERR_CONNECTION_REFUSED at <url>"). Navigation
+# timeouts and aborts (net::ERR_ABORTED) say nothing about the host.
+HOST_NET_ERRORS = ("net::ERR_NAME_NOT_RESOLVED", "net::ERR_CONNECTION_REFUSED", "net::ERR_CONNECTION_RESET",
+                   "net::ERR_CONNECTION_CLOSED", "net::ERR_CONNECTION_TIMED_OUT", "net::ERR_TIMED_OUT",
+                   "net::ERR_ADDRESS_UNREACHABLE", "net::ERR_EMPTY_RESPONSE")
+
+class CircuitOpen(ConnectionError):
+    """Raised instead of a request to a host whose circuit is open."""
+
+def is_host_failure(status=None, error=None) -> bool:
+    """Does this outcome say the host is down (as opposed to the page being missing)?"""
+    if error is not None:
+        if isinstance(error, CircuitOpen):
+            return False
+        if isinstance(error, (httpx.TransportError, TimeoutError, ConnectionError)):
+            return True
+        return any(code in str(error) for code in HOST_NET_ERRORS)
+    return status is None or status >= 500
+
+class CircuitBreaker:
+    def __init__(self, path=HEALTH_JSON):
+        self.path = path
+        self._hosts = None  # host -> {failures, open_until, last_error}
+        self._lock = threading.Lock()
+
+    @property
+    def hosts(self) -> dict:
+        if self._hosts is None:
+            try:
+                self._hosts = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._hosts = {}
+        return self._hosts
+
+    def allow(self, url) -> bool:
+        h = self.hosts.get(hostname(url))
+        return h is None or time.time() >= h.get("open_until", 0)
+
+    def check(self, url):
+        """Raise CircuitOpen if `url`'s host is being skipped."""
+        if not self.allow(url):
+            h = self.hosts[hostname(url)]
+            wait = h["open_until"] - time.time()
+            raise CircuitOpen(f"{hostname(url)} skipped for {wait:.0f}s more "
+                              f"after {h['failures']} failures ({h.get('last_error', '')})")
+
+    def success(self, url):
+        host = hostname(url)
+        if host not in self.hosts:
+            return
+        with self._lock:
+            self.hosts.pop(host, None)
+            self._save()
+
+    def failure(self, url, error=""):
+        host = hostname(url)
+        with self._lock:
+            h = self.hosts.setdefault(host, {"failures": 0, "open_until": 0})
+            if h["open_until"] > time.time():
+                return  # a request that was already in flight when the circuit opened
+            h["failures"] += 1
+            h["last_error"] = str(error)[:200]
+            over = h["failures"] - FAILURE_THRESHOLD
+            if over >= 0:
+                h["open_until"] = time.time() + min(MAX_BACKOFF_S, BASE_BACKOFF_S * 2 ** over)
+                print(f"[SCRAPER] circuit open: {host} after {h['failures']} failures")
+            self._save()
+
+    def record(self, url, status=None, error=None):
+        if is_host_failure(status, error):
+            self.failure(url, error if error is not None else f"HTTP {status}")
+        else:
+            self.success(url)
+
+    def snapshot(self) -> dict:
+        """Hosts currently being skipped -> seconds until their next trial."""
+        now = time.time()
+        with self._lock:
+            return {host: round(h["open_until"] - now) for host, h in self.hosts.items()
+                    if h.get("open_until", 0) > now}
+
+    def _save(self):
+        self.path.parent.mkdir(exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._hosts), encoding="utf-8")
+        tmp.replace(self.path)
+
+BREAKER = CircuitBreaker()
@@ -1,26 +1,397 @@
-import asyncio
+import asyncio, atexit, os, threading, time
+from collections import Counter
+from dataclasses import dataclass
 from playwright.async_api import async_playwright
+from .utils import hostname, check_cancelled, submit_to_loop, _notify
+from .archive import ARCHIVE
+from .ratelimit import LIMITER
+from .breaker import BREAKER
 
 UA = "Mozilla/5.0 (Macintosh; Intel Mac OS X 13_5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0 Safari/537.36 RootedBot/1.0"
+VIEWPORT = {"width":1280,"height":1200}
+DEFAULT_CONCURRENCY = 4
+# pages in the run-wide pool; brokers render concurrently, each up to its own `concurrency`
+BROWSER_PAGES = int(os.getenv("SCRAPER_BROWSER_PAGES", 2 * DEFAULT_CONCURRENCY))
 
-async def _fetch_dynamic(url: str, wait_selector: str | None = None, timeout_ms: int = 20000) -> str:
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
+@dataclass(frozen=True)
+class Readiness:
+    """When a rendered page counts as ready, checked after domcontentloaded.
+
+    Enabled conditions race each other and the first one to fire wins; if none
+    fires within `max_wait_ms` the page is taken as-is.
+    """
+    selector: str | None = None     # wait for this selector to be attached
+    network_idle: bool = False      # no network activity for ~500 ms
+    dom_quiet_ms: int = 0           # no DOM mutations for this long
+    max_wait_ms: int = 5000
+
+DEFAULT_READINESS = Readiness(network_idle=True, dom_quiet_ms=500, max_wait_ms=5000)
+
+_DOM_QUIET_JS = """
+(quiet) => new Promise((resolve) => {
+  let timer = null;
+  const obs = new MutationObserver(() => { clearTimeout(timer); timer = setTimeout(done, quiet); });
+  function done() { obs.disconnect(); resolve(true); }
+  obs.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+  timer = setTimeout(done, quiet);
+})
+"""
+
+async def wait_ready(page, readiness: Readiness) -> tuple[str, int]:
+    """Block until `readiness` is met; returns (strategy that fired, ms waited)."""
+    started = time.perf_counter()
+    cap = readiness.max_wait_ms
+    waiters = {}
+    if readiness.selector:
+        waiters["selector"] = page.wait_for_selector(readiness.selector, state="attached", timeout=cap)
+    if readiness.network_idle:
+        waiters["network_idle"] = page.wait_for_load_state("networkidle", timeout=cap)
+    if readiness.dom_quiet_ms:
+        waiters["dom_quiet"] = page.evaluate(_DOM_QUIET_JS, readiness.dom_quiet_ms)
+
+    fired = "max_wait"
+    pending = {asyncio.ensure_future(w): name for name, w in waiters.items()}
+    try:
+        while pending:
+            remaining = cap / 1000 - (time.perf_counter() - started)
+            if remaining <= 0:
+                break
+            done, _ = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                name = pending.pop(task)
+                if task.exception() is None and fired == "max_wait":
+                    fired = name
+            if fired != "max_wait":
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+    return fired, round((time.perf_counter() - started) * 1000)
+
+ANALYTICS_DOMAINS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "facebook.net", "connect.facebook.net", "hotjar.com", "clarity.ms", "hs-analytics.net",
+    "hs-scripts.com", "hubspot.com", "licdn.com", "ads-twitter.com", "bing.com",
+    "youtube.com", "ytimg.com", "vimeo.com", "cdn.segment.com", "newrelic.com", "nr-data.net",
+)
+# rough transfer sizes used to estimate what a blocked request would have cost
+_EST_BYTES = {"image": 60_000, "media": 500_000, "font": 40_000, "stylesheet": 30_000, "script": 40_000}
+
+@dataclass(frozen=True)
+class ResourcePolicy:
+    """Which subrequests a render aborts; the scrapers only read text and links."""
+    block_types: frozenset = frozenset({"image", "media", "font"})
+    block_domains: tuple = ANALYTICS_DOMAINS
+
+    def blocks(self, resource_type: str, url: str) -> bool:
+        if resource_type in self.block_types:
+            return True
+        host = hostname(url)
+        return any(host == d or host.endswith("." + d) for d in self.block_domains)
+
+DEFAULT_RESOURCES = ResourcePolicy()
+ALLOW_ALL = ResourcePolicy(block_types=frozenset(), block_domains=())
+
+def _readiness_for(wait_selector: str | None) -> Readiness:
+    # a bare "body" matches on domcontentloaded, so it says nothing about JS-rendered content
+    if wait_selector and wait_selector.strip() != "body":
+        return Readiness(selector=wait_selector, network_idle=True, max_wait_ms=DEFAULT_READINESS.max_wait_ms)
+    return DEFAULT_READINESS
+
+class BrowserPool:
+    """One headless Chromium shared by `size` reusable contexts/pages.
+
+    Use as an async context manager; `fetch` checks a page out of the pool,
+    renders the URL and hands the page back for the next caller. Given a
+    running `browser`, the pool opens its pages in it and leaves it running
+    on close (see SharedBrowser).
+    """
+
+    def __init__(self, size: int = DEFAULT_CONCURRENCY, timeout_ms: int = 20000,
+                 resources: ResourcePolicy = DEFAULT_RESOURCES, browser=None):
+        self.size = max(1, size)
+        self.timeout_ms = timeout_ms
+        self.resources = resources
+        self._pw = None
+        self._browser = browser
+        self._own_browser = browser is None
+        self._pages: asyncio.Queue | None = None
+        self._live = 0  # pages in circulation (checked out or queued)
+        self._blocked = {}  # page -> {"requests": n, "bytes": estimated bytes} for the current render
+        self.readiness_log: list[tuple[str, str, int]] = []  # (url, strategy, waited_ms)
+        self.resource_log: list[tuple[str, int, int]] = []   # (url, blocked requests, est. bytes saved)
+
+    async def _new_page(self):
+        ctx = await self._browser.new_context(user_agent=UA, viewport=VIEWPORT)
+        page = await ctx.new_page()
+        counter = self._blocked[page] = {"requests": 0, "bytes": 0}
+        if self.resources.block_types or self.resources.block_domains:
+            async def _route(route):
+                req = route.request
+                if self.resources.blocks(req.resource_type, req.url):
+                    counter["requests"] += 1
+                    counter["bytes"] += _EST_BYTES.get(req.resource_type, 10_000)
+                    await route.abort()
+                else:
+                    await route.continue_()
+            await ctx.route("**/*", _route)
+        return page
+
+    async def _replacement_page(self):
+        """A fresh page for a slot whose page was discarded; None (pool shrinks) if one can't be made."""
+        for _ in range(2):
+            try:
+                return await self._new_page()
+            except Exception as e:
+                err = e
+        self._live -= 1
+        print(f"[SCRAPER] browser pool: dropping a page slot ({self._live} left) -> {err}")
+        if self._live == 0:
+            self._pages.put_nowait(None)  # fetches fail fast instead of waiting forever
+        return None
+
+    async def __aenter__(self):
         try:
-            ctx = await browser.new_context(user_agent=UA, viewport={"width":1280,"height":1200})
-            page = await ctx.new_page()
-            await page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
-            if wait_selector:
+            if self._own_browser:
+                self._pw = await async_playwright().start()
+                self._browser = await self._pw.chromium.launch(headless=True)
+            self._pages = asyncio.Queue()
+            for _ in range(self.size):
+                self._pages.put_nowait(await self._new_page())
+            self._live = self.size
+        except BaseException:
+            await self.close()
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def render_summary(self) -> dict:
+        waits = [ms for _, _, ms in self.readiness_log]
+        return {
+            "pages": len(waits),
+            "fired": dict(Counter(name for _, name, _ in self.readiness_log)),
+            "avg_wait_ms": round(sum(waits) / len(waits)) if waits else 0,
+            "blocked_requests": sum(n for _, n, _ in self.resource_log),
+            "est_bytes_saved": sum(b for _, _, b in self.resource_log),
+            "est_bytes_saved_per_page": round(sum(b for _, _, b in self.resource_log) / len(waits)) if waits else 0,
+        }
+
+    async def close(self):
+        if self.readiness_log:
+            print(f"[SCRAPER] render summary: {self.render_summary()}")
+        if not self._own_browser:
+            for page in list(self._blocked):
                 try:
-                    await page.wait_for_selector(wait_selector, timeout=timeout_ms)
-                except:
+                    await page.context.close()
+                except Exception:
                     pass
-            await page.wait_for_timeout(1200)
+            self._blocked.clear()
+            return
+        try:
+            if self._browser:
+                await self._browser.close()
+        finally:
+            self._browser = None
+            if self._pw:
+                await self._pw.stop()
+                self._pw = None
+
+    async def fetch(self, url: str, wait_selector: str | None = None, timeout_ms: int | None = None,
+                    readiness: Readiness | None = None) -> str:
+        timeout_ms = timeout_ms or self.timeout_ms
+        readiness = readiness or _readiness_for(wait_selector)
+        check_cancelled()
+        BREAKER.check(url)
+        if not await asyncio.to_thread(LIMITER.allowed, url):
+            raise PermissionError(f"disallowed by robots.txt: {url}")
+        page = await self._pages.get()
+        if page is None:
+            self._pages.put_nowait(None)  # wake the next waiter too
+            raise RuntimeError("browser pool has no usable pages left")
+        counter = self._blocked[page]
+        counter["requests"] = counter["bytes"] = 0
+        try:
+            await LIMITER.acquire_async(url)
+            t0 = time.monotonic()
+            try:
+                resp = await page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
+            except Exception as e:
+                LIMITER.record(url, None, time.monotonic() - t0)
+                BREAKER.record(url, error=e)
+                raise
+            LIMITER.record(url, resp.status if resp else None, time.monotonic() - t0,
+                           resp.headers.get("retry-after") if resp else None)
+            if resp is not None:
+                BREAKER.record(url, resp.status)
+            fired, waited = await wait_ready(page, readiness)
             html = await page.content()
-            await ctx.close()
+            ARCHIVE.put(url, "rendered", html, "text/html; charset=utf-8")
+            self.readiness_log.append((url, fired, waited))
+            self.resource_log.append((url, counter["requests"], counter["bytes"]))
             return html
+        except Exception:
+            # a page that errored mid-navigation may be wedged; swap in a fresh context
+            self._blocked.pop(page, None)
+            try:
+                await page.context.close()
+            except Exception:
+                pass
+            page = await self._replacement_page()
+            raise
         finally:
-            await browser.close()
+            if page is not None:
+                self._pages.put_nowait(page)
+
+class SharedBrowser:
+    """The run-wide Chromium: started on first render, shut down by `close()`.
+
+    Playwright objects belong to the event loop that created them, while
+    brokers render from their own threads and asyncio.run loops, so the
+    browser lives on a loop thread of its own and every render is shipped
+    there. Pages come from one BrowserPool per ResourcePolicy (request
+    blocking is set up per context), all in the same browser.
+    """
+
+    def __init__(self, size: int = BROWSER_PAGES):
+        self.size = size
+        self._loop = None
+        self._loop_lock = threading.Lock()
+        self._start_lock = None  # asyncio.Lock, made on the browser loop
+        self._pw = None
+        self._browser = None
+        self._pools = {}  # ResourcePolicy -> BrowserPool
+
+    def _get_loop(self):
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="browser-loop", daemon=True).start()
+            return self._loop
+
+    def run(self, coro):
+        """Run `coro` on the browser loop and wait for it (from sync code)."""
+        return submit_to_loop(self._get_loop(), coro).result()
+
+    async def call(self, coro):
+        """Await `coro` on the browser loop from any event loop."""
+        loop = self._get_loop()
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(submit_to_loop(loop, coro))
+
+    async def pool(self, resources: ResourcePolicy = DEFAULT_RESOURCES) -> BrowserPool:
+        """The pool for `resources`, launching Chromium if needed (on the browser loop only)."""
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._browser is not None and not self._browser.is_connected():
+                print("[SCRAPER] browser disconnected; relaunching")
+                await self._close()
+            pool = self._pools.get(resources)
+            if pool is not None and pool._live == 0:  # every page slot was lost: start it over
+                await pool.close()
+                pool = None
+            if pool is None:
+                if self._browser is None:
+                    pw = await async_playwright().start()
+                    try:
+                        self._browser = await pw.chromium.launch(headless=True)
+                    except BaseException:
+                        await pw.stop()
+                        raise
+                    self._pw = pw
+                pool = await BrowserPool(self.size, resources=resources, browser=self._browser).__aenter__()
+                self._pools[resources] = pool
+            return pool
+
+    async def _close(self):
+        pools, self._pools = self._pools, {}
+        browser, pw = self._browser, self._pw
+        self._browser = self._pw = None
+        try:
+            for pool in pools.values():
+                await pool.close()
+            if browser is not None:
+                await browser.close()
+        except Exception as e:
+            print(f"[SCRAPER] browser shutdown: {e}")
+        finally:
+            if pw is not None:
+                await pw.stop()
+
+    def close(self):
+        """Shut Chromium down (end of a run); the loop thread stays for the next render."""
+        if self._loop is not None and self._browser is not None:
+            self.run(self._close())
+
+SHARED_BROWSER = SharedBrowser()
+atexit.register(SHARED_BROWSER.close)
+
+async def fetch_dynamic_many(urls, wait_selector: str | None = None, concurrency: int = DEFAULT_CONCURRENCY,
+                             timeout_ms: int = 20000, readiness: Readiness | None = None,
+                             resources: ResourcePolicy = DEFAULT_RESOURCES, on_result=None):
+    """Render URLs in parallel in the shared browser; returns HTML in input order, None on failure.
+
+    At most `concurrency` of these URLs render at once. `on_result(index,
+    html)` is called as each page finishes rendering (on the browser loop; a
+    coroutine function is awaited, so it must not block).
+    """
+    urls = list(urls)
+    if not urls:
+        return []
+    return await SHARED_BROWSER.call(_render_many(urls, wait_selector, concurrency, timeout_ms, readiness,
+                                                  resources, on_result))
+
+async def _render_many(urls, wait_selector, concurrency, timeout_ms, readiness, resources, on_result):
+    if ARCHIVE.replaying:
+        out = [ARCHIVE.rendered(u) for u in urls]
+        if on_result is not None:
+            for i, html in enumerate(out):
+                await _notify(on_result, i, html)
+        return out
+    check_cancelled()  # don't start a browser for a broker that has been abandoned
+    pool = await SHARED_BROWSER.pool(resources)
+    slots = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(i, u):
+        try:
+            async with slots:
+                html = await pool.fetch(u, wait_selector, timeout_ms=timeout_ms, readiness=readiness)
+        except Exception as e:
+            print(f"[SCRAPER] render FAIL: {u} -> {e}")
+            html = None
+        if on_result is not None:
+            await _notify(on_result, i, html)
+        return html
+    return await asyncio.gather(*(one(i, u) for i, u in enumerate(urls)))
+
+def render_many(urls, wait_selector: str | None = None, concurrency: int = DEFAULT_CONCURRENCY,
+                timeout_ms: int = 20000, readiness: Readiness | None = None,
+                resources: ResourcePolicy = DEFAULT_RESOURCES, on_result=None):
+    urls = list(urls)
+    if not urls:
+        return []
+    return SHARED_BROWSER.run(_render_many(urls, wait_selector, concurrency, timeout_ms, readiness, resources,
+                                           on_result))
+
+async def _fetch_dynamic(url: str, wait_selector: str | None = None, timeout_ms: int = 20000,
+                         readiness: Readiness | None = None,
+                         resources: ResourcePolicy = DEFAULT_RESOURCES) -> str:
+    if ARCHIVE.replaying:
+        html = ARCHIVE.rendered(url)
+        if html is None:
+            raise LookupError(f"not in archive: {url}")
+        return html
+    pool = await SHARED_BROWSER.pool(resources)
+    return await pool.fetch(url, wait_selector, timeout_ms=timeout_ms, readiness=readiness)
 
-def fetch_dynamic(url: str, wait_selector: str | None = None, timeout_ms: int = 20000) -> str:
-    return asyncio.run(_fetch_dynamic(url, wait_selector, timeout_ms))
+def fetch_dynamic(url: str, wait_selector: str | None = None, timeout_ms: int = 20000,
+                  readiness: Readiness | None = None,
+                  resources: ResourcePolicy = DEFAULT_RESOURCES) -> str:
+    return SHARED_BROWSER.run(_fetch_dynamic(url, wait_selector, timeout_ms, readiness, resources))
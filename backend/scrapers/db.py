@@ -0,0 +1,305 @@
+"""Embedded SQLite store (WAL) for listings, their history and the appraisal dataset.
+
+This database is the source of truth for scraped data: a run writes here and
+nowhere else. scraped_listings.csv, appraisal_dataset.csv and the Parquet
+store are only read once, to seed an empty database, and otherwise produced
+from it on demand (python -m scrapers.export).
+
+    listings           current state, one row per URL
+    listing_snapshots  a row whenever a listing is first seen or a tracked field changes
+    appraisals         deduped appraisal rows (province + five numbers)
+
+Writers batch rows into one transaction per chunk; readers never block them (WAL).
+"""
+import base64, json, math, sqlite3, threading
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from .utils import DATA_DIR
+from .storage import HAVE_ARROW, LISTINGS, APPRAISALS
+
+DB_PATH = DATA_DIR / "rooted.db"
+BATCH = 500
+
+TRACKED = ["title", "province", "asking_price", "collections", "ebitda_or_sde",
+           "equipped_ops", "sqft", "appraised_value"]
+LISTING_COLUMNS = ["broker", "title", "url", "province", "asking_price", "collections",
+                   "ebitda_or_sde", "equipped_ops", "sqft", "scraped_at", "appraised_value"]
+APPRAISAL_COLUMNS = ["province", "collections", "ebitda_or_sde", "equipped_ops", "sqft", "appraised_value"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    url             TEXT PRIMARY KEY,
+    broker          TEXT,
+    title           TEXT,
+    province        TEXT,
+    asking_price    REAL,
+    collections     REAL,
+    ebitda_or_sde   REAL,
+    equipped_ops    REAL,
+    sqft            REAL,
+    appraised_value REAL,
+    first_seen      TEXT NOT NULL,
+    scraped_at      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_listings_province ON listings(province);
+CREATE INDEX IF NOT EXISTS ix_listings_broker ON listings(broker);
+-- keyset pages on (scraped_at, url); replaces the scraped_at-only index of older databases
+DROP INDEX IF EXISTS ix_listings_scraped_at;
+CREATE INDEX IF NOT EXISTS ix_listings_scraped_at_url ON listings(scraped_at, url);
+
+CREATE TABLE IF NOT EXISTS listing_snapshots (
+    id              INTEGER PRIMARY KEY,
+    url             TEXT NOT NULL REFERENCES listings(url),
+    scraped_at      TEXT NOT NULL,
+    title           TEXT,
+    province        TEXT,
+    asking_price    REAL,
+    collections     REAL,
+    ebitda_or_sde   REAL,
+    equipped_ops    REAL,
+    sqft            REAL,
+    appraised_value REAL
+);
+CREATE INDEX IF NOT EXISTS ix_snapshots_url ON listing_snapshots(url, scraped_at);
+
+CREATE TABLE IF NOT EXISTS appraisals (
+    key             TEXT PRIMARY KEY,
+    province        TEXT,
+    collections     REAL,
+    ebitda_or_sde   REAL,
+    equipped_ops    REAL,
+    sqft            REAL,
+    appraised_value REAL,
+    added_at        TEXT NOT NULL
+);
+
+-- benchmarks are served from model.BENCHMARKS; drop the mirror older databases kept
+DROP TABLE IF EXISTS benchmarks;
+
+CREATE TABLE IF NOT EXISTS meta (
+    key             TEXT PRIMARY KEY,
+    value           INTEGER NOT NULL
+);
+"""
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialised = set()
+
+def connect(path=DB_PATH) -> sqlite3.Connection:
+    """This thread's connection to `path`, schema created on first use."""
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(str(path))
+    if conn is None:
+        path.parent.mkdir(exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        with _init_lock:
+            if str(path) not in _initialised:
+                conn.executescript(SCHEMA)
+                _initialised.add(str(path))
+        conns[str(path)] = conn
+    return conn
+
+def _clean(v):
+    """pandas/numpy cell -> plain Python value sqlite3 can bind; blanks become None."""
+    if v is None or v is pd.NA or v is pd.NaT:
+        return None
+    if hasattr(v, "item"):  # numpy scalar
+        v = v.item()
+    if isinstance(v, float) and math.isnan(v):
+        return None
+    if isinstance(v, str) and not v.strip():
+        return None
+    return v
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+def _chunks(rows, n=BATCH):
+    for i in range(0, len(rows), n):
+        yield rows[i:i + n]
+
+def _bump(conn, key):
+    conn.execute("INSERT INTO meta (key, value) VALUES (?, 1) "
+                 "ON CONFLICT(key) DO UPDATE SET value = value + 1", (key,))
+
+def version(key: str, path=DB_PATH) -> int:
+    """Write counter for a table (e.g. "listings"); changes whenever its rows may have."""
+    row = connect(path).execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else 0
+
+def upsert_listings(rows, path=DB_PATH) -> dict:
+    """Insert or update listings by URL; snapshot the new and the changed ones.
+
+    `rows` are dicts with LISTING_COLUMNS keys. Returns {new, changed, unchanged}.
+    """
+    conn = connect(path)
+    stats = {"new": 0, "changed": 0, "unchanged": 0}
+    now = _now_iso()
+    clean = []
+    for r in rows:
+        c = {k: _clean(r.get(k)) for k in LISTING_COLUMNS}
+        if c["url"]:
+            c["scraped_at"] = c["scraped_at"] or now
+            clean.append(c)
+    clean = list({c["url"]: c for c in clean}.values())  # last row per URL wins
+    for batch in _chunks(clean):
+        with conn:
+            marks = ",".join("?" * len(batch))
+            prev = {row["url"]: row for row in conn.execute(
+                f"SELECT url, {', '.join(TRACKED)} FROM listings WHERE url IN ({marks})",
+                [c["url"] for c in batch])}
+            snaps = []
+            for c in batch:
+                old = prev.get(c["url"])
+                if old is None:
+                    stats["new"] += 1
+                elif any(old[k] != c[k] for k in TRACKED):
+                    stats["changed"] += 1
+                else:
+                    stats["unchanged"] += 1
+                    continue
+                snaps.append([c["url"], c["scraped_at"]] + [c[k] for k in TRACKED])
+            cols = LISTING_COLUMNS + ["first_seen"]
+            conn.executemany(
+                f"INSERT INTO listings ({', '.join(cols)}) VALUES ({','.join('?' * len(cols))}) "
+                f"ON CONFLICT(url) DO UPDATE SET "
+                + ", ".join(f"{k} = excluded.{k}" for k in LISTING_COLUMNS if k != "url"),
+                [[c[k] for k in LISTING_COLUMNS] + [c["scraped_at"]] for c in batch])
+            conn.executemany(
+                f"INSERT INTO listing_snapshots (url, scraped_at, {', '.join(TRACKED)}) "
+                f"VALUES ({','.join('?' * (len(TRACKED) + 2))})", snaps)
+            _bump(conn, "listings")
+    return stats
+
+def _appraisal_values(r) -> list:
+    vals = [_clean(r.get(k)) for k in APPRAISAL_COLUMNS]
+    # 1 and 1.0 must dedupe together
+    return vals[:1] + [float(v) if v is not None else None for v in vals[1:]]
+
+def add_appraisals(rows, path=DB_PATH):
+    """Insert appraisal rows not stored yet; returns (the new rows, total stored)."""
+    conn = connect(path)
+    now = _now_iso()
+    fresh = []
+    for batch in _chunks(list(rows)):
+        with conn:
+            for r in batch:
+                vals = _appraisal_values(r)
+                cur = conn.execute(
+                    f"INSERT OR IGNORE INTO appraisals (key, {', '.join(APPRAISAL_COLUMNS)}, added_at) "
+                    f"VALUES ({','.join('?' * (len(APPRAISAL_COLUMNS) + 2))})",
+                    [json.dumps(vals)] + vals + [now])
+                if cur.rowcount:
+                    fresh.append(dict(zip(APPRAISAL_COLUMNS, vals)))
+    total = conn.execute("SELECT COUNT(*) FROM appraisals").fetchone()[0]
+    return fresh, total
+
+def is_empty(table: str, path=DB_PATH) -> bool:
+    return connect(path).execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is None
+
+def seed_from_history(scraped_csv, appraisal_csv, path=DB_PATH):
+    """One-off import of the file history (Parquet store and CSVs) into empty tables.
+
+    The Parquet listings store holds every run, so it is replayed day by day
+    (each change becomes a snapshot); scraped_listings.csv only has the last
+    run and is used without it. Appraisals come from both, deduped on insert.
+    """
+    if is_empty("listings", path):
+        if HAVE_ARROW and LISTINGS.exists():
+            runs = LISTINGS.read(columns=LISTING_COLUMNS).sort_values("scraped_at", kind="stable")
+            runs["scraped_at"] = runs["scraped_at"].map(lambda t: t.isoformat() if pd.notna(t) else None)
+            for _, day in runs.groupby(runs["scraped_at"].str[:10], sort=True):
+                upsert_listings(day.to_dict(orient="records"), path)
+        elif scraped_csv.exists():
+            upsert_listings(pd.read_csv(scraped_csv).to_dict(orient="records"), path)
+    if is_empty("appraisals", path):
+        if HAVE_ARROW and APPRAISALS.exists():
+            add_appraisals(APPRAISALS.read(columns=APPRAISAL_COLUMNS).to_dict(orient="records"), path)
+        if appraisal_csv.exists():
+            add_appraisals(pd.read_csv(appraisal_csv).to_dict(orient="records"), path)
+
+EXPORTS = {"listings": (LISTING_COLUMNS, "scraped_at, url"), "appraisals": (APPRAISAL_COLUMNS, "added_at, key")}
+
+def table_frame(table: str, path=DB_PATH) -> pd.DataFrame:
+    """A whole exportable table (EXPORTS), oldest row first, in the CSV column order."""
+    cols, order = EXPORTS[table]
+    return pd.read_sql_query(f"SELECT {', '.join(cols)} FROM {table} ORDER BY {order}", connect(path))
+
+def encode_cursor(scraped_at, url) -> str:
+    return base64.urlsafe_b64encode(json.dumps([scraped_at, url]).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    """(scraped_at, url) from a cursor; ValueError if it was not made by encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        scraped_at, url = json.loads(raw)
+    except Exception as e:
+        raise ValueError("bad cursor") from e
+    if not isinstance(scraped_at, str) or not isinstance(url, str):
+        raise ValueError("bad cursor")
+    return scraped_at, url
+
+def _listing_filters(broker=None, province=None, min_price=None, max_price=None, since=None, until=None):
+    where, params = [], []
+    for sql, val in (("broker = ?", broker), ("province = ?", province.upper() if province else None),
+                     ("asking_price >= ?", min_price), ("asking_price <= ?", max_price),
+                     ("scraped_at >= ?", since), ("scraped_at < ?", until)):
+        if val is not None:
+            where.append(sql)
+            params.append(val)
+    return where, params
+
+def listings_page(fields=None, cursor=None, limit=200, path=DB_PATH, **filters):
+    """One page of listings, newest first; returns (rows, next_cursor or None).
+
+    Keyset pagination on (scraped_at, url), so a page costs the same however
+    deep it is. `filters`: broker, province, min_price/max_price (asking
+    price), since/until (scraped_at, ISO, until exclusive). `fields` limits
+    the columns returned.
+    """
+    fields = list(fields or LISTING_COLUMNS)
+    where, params = _listing_filters(**filters)
+    if cursor:
+        where.append("(scraped_at, url) < (?, ?)")
+        params.extend(decode_cursor(cursor))
+    cols = list(dict.fromkeys(fields + ["scraped_at", "url"]))
+    sql = f"SELECT {', '.join(cols)} FROM listings"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY scraped_at DESC, url DESC LIMIT ?"
+    rows = connect(path).execute(sql, params + [limit + 1]).fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    nxt = encode_cursor(rows[-1]["scraped_at"], rows[-1]["url"]) if more else None
+    return [{k: r[k] for k in fields} for r in rows], nxt
+
+def iter_listings(fields=None, cursor=None, limit=None, chunk=1000, path=DB_PATH, **filters):
+    """Every matching listing (up to `limit`), fetched a keyset page at a time.
+
+    Each chunk is its own short query on the calling thread's connection, so
+    this can back a streaming response without holding a read transaction open.
+    """
+    left = limit
+    while left is None or left > 0:
+        n = chunk if left is None else min(chunk, left)
+        rows, cursor = listings_page(fields, cursor, n, path, **filters)
+        yield from rows
+        if left is not None:
+            left -= len(rows)
+        if cursor is None:
+            return
+
+def listing_history(url: str, path=DB_PATH) -> list:
+    rows = connect(path).execute(
+        f"SELECT scraped_at, {', '.join(TRACKED)} FROM listing_snapshots WHERE url = ? ORDER BY scraped_at",
+        (url,)).fetchall()
+    return [dict(r) for r in rows]
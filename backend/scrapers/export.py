@@ -0,0 +1,24 @@
+"""Export a table of the SQLite store (the source of truth) to CSV or Parquet.
+
+    python -m scrapers.export listings data/scraped_listings.csv
+    python -m scrapers.export appraisals data/appraisal_dataset.csv
+    python -m scrapers.export listings --parquet      # rebuilds data/store/listings
+"""
+import sys
+
+from . import db
+from .storage import HAVE_ARROW, STORES
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] not in STORES:
+        sys.exit(f"usage: python -m scrapers.export {{{'|'.join(STORES)}}} {{OUT.csv|--parquet}}")
+    table, out = sys.argv[1:]
+    df = db.table_frame(table)
+    if out == "--parquet":
+        if not HAVE_ARROW:
+            sys.exit("pyarrow is not installed")
+        store = STORES[table]
+        print(f"[STORE] {store.rewrite(df)} rows -> {store.path}")
+    else:
+        df.to_csv(out, index=False)
+        print(f"[STORE] {df.shape[0]} rows -> {out}")
@@ -0,0 +1,242 @@
+import re
+from bisect import bisect_left
+from selectolax.parser import HTMLParser
+
+# (min, max) per field; None = open-ended. Adapters extend this with their own money floors.
+SANITY_RANGES = {"sqft": (350, 12000), "equipped_ops": (1, 25)}
+
+# label-ish nodes, in the precedence the adapters' old `css("strong, b, th, .label, ...")` gave them
+LABEL_GROUPS = (("tag", "strong"), ("tag", "b"), ("tag", "th"), ("class", "label"), ("class", "listing__label"))
+LABEL_TAG_GROUP = {name: g for g, (kind, name) in enumerate(LABEL_GROUPS) if kind == "tag"}
+LIST_SELECTORS = (".elementor-icon-list-item", ".elementor-widget-text-editor li", "li")
+NEIGHBOR_TAGS = {"span", "div", "dd", "td"}
+
+class AliasMatcher:
+    """Every field's label aliases compiled into one regex, so a label is scanned once.
+
+    Matching keeps the old substring semantics: a label maps to every field
+    that has an alias occurring anywhere in it.
+    """
+
+    def __init__(self, aliases: dict):
+        self.order = {f: i for i, f in enumerate(aliases)}
+        owners = {}
+        for field, opts in aliases.items():
+            for a in opts:
+                owners.setdefault(a.lower(), []).append(field)
+        # the regex reports the longest alias at each position; any shorter alias
+        # matching there is a prefix of it, so its fields are folded in up front
+        self._fields_at = {
+            a: tuple(dict.fromkeys(f for b, fs in owners.items() if a.startswith(b) for f in fs))
+            for a in owners
+        }
+        alts = sorted(owners, key=len, reverse=True)
+        self.aliases = tuple(alts)
+        self._rx = re.compile("(?=(" + "|".join(map(re.escape, alts)) + "))")
+
+    def fields(self, text: str) -> tuple:
+        found = set()
+        for m in self._rx.finditer((text or "").strip().lower()):
+            found.update(self._fields_at[m.group(1)])
+        return tuple(sorted(found, key=self.order.__getitem__))
+
+def _nearest(node, tag):
+    p = node.parent
+    while p is not None and p.tag != tag:
+        p = p.parent
+    return p
+
+def _class_groups(root: HTMLParser, want) -> dict:
+    """mem_id -> (source, group) for the class-based selectors, via one C-level css() each.
+
+    Reading attributes from Python for every node costs more than the whole walk.
+    """
+    out = {}
+    if "label" in want:
+        for g, (kind, name) in enumerate(LABEL_GROUPS):
+            if kind == "class":
+                for n in root.css(f".{name}"):
+                    out.setdefault(n.mem_id, ("label", g))
+    if "li" in want:
+        for g, sel in enumerate(LIST_SELECTORS):
+            for n in root.css(sel):
+                out.setdefault(n.mem_id, ("li", g))
+    return out
+
+def iter_descendants(node):
+    """Pre-order walk of the subtree under `node` (Node.traverse runs on past the subtree)."""
+    stack = []
+    cur = node.child
+    while cur is not None or stack:
+        if cur is None:
+            cur = stack.pop()
+            continue
+        yield cur
+        if cur.next is not None:
+            stack.append(cur.next)
+        cur = cur.child
+
+def _neighbor_texts(parent, memo) -> list:
+    """Text of the first three span/div/dd/td under `parent`, computed once per parent."""
+    key = parent.mem_id
+    if key not in memo:
+        bits = []
+        for ch in iter_descendants(parent):
+            if ch.tag in NEIGHBOR_TAGS:
+                bits.append(ch.text(strip=True))
+                if len(bits) == 3:
+                    break
+        memo[key] = bits
+    return memo[key]
+
+def neighbors_text(node, memo) -> str:
+    """Label node + next sibling + nearby value containers, for 'Label' + 'Value' layouts."""
+    bits = [node.text(strip=True)]
+    if node.next is not None:
+        bits.append(node.next.text(strip=True))
+    if node.parent is not None:
+        bits.extend(_neighbor_texts(node.parent, memo))
+    return " | ".join(b for b in bits if b)
+
+def label_candidates(root: HTMLParser, matcher: AliasMatcher, sources=("dl", "table", "label", "li")):
+    """Walk the DOM once and yield (source, order, field, label_text, value_text).
+
+    Sources: "dl" (dt/dd pairs), "table" (first two cells of a row), "label"
+    (strong/b/th/.label nodes with their neighbours) and "li" (list items,
+    incl. Elementor icon lists, whose own text is both label and value).
+    `order` sorts candidates within a source: (selector group, document position).
+    """
+    top = root.root
+    if top is None:
+        return
+    want = set(sources)
+    classed = _class_groups(root, want)
+    dls, rows, singles = {}, {}, []
+    for i, node in enumerate(top.traverse()):
+        tag = node.tag
+        if tag in ("dt", "dd") and "dl" in want:
+            dl = _nearest(node, "dl")
+            if dl is not None:
+                dls.setdefault(dl.mem_id, ([], []))[tag == "dd"].append((i, node))
+        if tag in ("th", "td") and "table" in want:
+            tr = _nearest(node, "tr")
+            if tr is not None:
+                rows.setdefault(tr.mem_id, []).append((i, node))
+        if tag in LABEL_TAG_GROUP and "label" in want:
+            singles.append(("label", (LABEL_TAG_GROUP[tag], i), node))
+        elif classed:
+            hit = classed.get(node.mem_id)
+            if hit is not None:
+                singles.append((hit[0], (hit[1], i), node))
+
+    for dts, dds in dls.values():
+        for k, (i, dt) in enumerate(dts):
+            label = dt.text(strip=True)
+            fields = matcher.fields(label) if label else ()
+            if fields:
+                value = dds[k][1].text(strip=True) if k < len(dds) else ""
+                for f in fields:
+                    yield "dl", (0, i), f, label, value
+
+    for cells in rows.values():
+        if len(cells) < 2:
+            continue
+        i, first = cells[0]
+        label = first.text(strip=True)
+        fields = matcher.fields(label)
+        if fields:
+            value = cells[1][1].text(strip=True)
+            for f in fields:
+                yield "table", (0, i), f, label, value
+
+    memo = {}
+    for source, i, node in singles:
+        if source == "li":
+            text = node.text(separator=" ", strip=True) or ""
+            for f in matcher.fields(text):
+                yield "li", i, f, text, text
+            continue
+        label = node.text(strip=True)
+        fields = matcher.fields(label) if label else ()
+        if fields:
+            bundle = neighbors_text(node, memo)
+            for f in fields:
+                yield "label", i, f, label, bundle
+
+def in_range(field, num, ranges) -> bool:
+    lo, hi = ranges.get(field, (None, None))
+    return (lo is None or num >= lo) and (hi is None or num <= hi)
+
+def extract_labeled(root: HTMLParser, matcher: AliasMatcher, to_value, sources=("dl", "table", "label", "li"),
+                    ranges=SANITY_RANGES) -> dict:
+    """Resolve label candidates into one value per field.
+
+    `to_value(field, source, label, value)` turns a candidate into a number (or
+    None). Earlier sources in `sources` are more trusted, then document order;
+    the first candidate inside the field's sanity range wins.
+    """
+    rank = {s: r for r, s in enumerate(sources)}
+    best = {}
+    for source, order, field, label, value in label_candidates(root, matcher, sources):
+        key = (rank[source], *order)
+        if field in best and best[field][0] <= key:
+            continue
+        num = to_value(field, source, label, value)
+        if num is not None and in_range(field, num, ranges):
+            best[field] = (key, num)
+    return {f: (best[f][1] if f in best else None) for f in matcher.order}
+
+NUMBER_RE = re.compile(r'(?<![\d.])(\d{1,3}(?:,\d{3})+|\d+)(\.\d+)?')
+# extra distance for a number ahead of its keyword: "Price: $500,000 Cash Flow: $90,000"
+# should give cash flow the value after it, while "1,400 sq ft" still resolves
+AHEAD_PENALTY = 8
+
+def _label_spans(doc, stops) -> list:
+    """(start, end) of every word-initial occurrence of the `stops` labels, by start."""
+    text = doc.lower
+    return [(i, i + len(k)) for i, _, k in doc.hits(stops) if i == 0 or not text[i - 1].isalnum()]
+
+def find_near(doc, keywords, before=20, after=140, lo=None, hi=None, integer=False, stops=()):
+    """Best in-range number near any occurrence of any of `keywords`.
+
+    Every number from `before` chars ahead of a keyword hit to `after` chars
+    past it is a candidate, for all hits rather than just the first. The
+    closest wins (numbers ahead of the keyword pay AHEAD_PENALTY, since values
+    usually follow their label), then the earlier keyword in `keywords`.
+    `stops` (every field's labels, e.g. AliasMatcher.aliases) end the window
+    at the next label and start it after the previous one, so "Price: call |
+    Gross Billings $1.6M" gives the price nothing.
+    """
+    text = doc.lower
+    spans = _label_spans(doc, stops) if stops else []
+    starts = [a for a, _ in spans]
+    best = None
+    for s, rank, kw in doc.hits(keywords):
+        e = s + len(kw)
+        start, end = max(0, s - before), e + after
+        k = bisect_left(starts, e)
+        if k < len(spans):
+            end = min(end, spans[k][0])
+        for a, b in reversed(spans[:bisect_left(starts, s)]):
+            if b <= s:
+                start = max(start, b)
+                break
+        for m in NUMBER_RE.finditer(text, start, end):
+            ns, ne = m.span()
+            if ns >= e:
+                dist = ns - e
+            elif ne <= s:
+                dist = s - ne + AHEAD_PENALTY
+            else:
+                continue
+            if best is not None and (dist, rank, s) >= best[0]:
+                if ns >= e:
+                    break  # later numbers are only further away
+                continue
+            val = float(m.group(1).replace(",", "") + (m.group(2) or ""))
+            if (lo is not None and val < lo) or (hi is not None and val > hi):
+                continue
+            if integer and not val.is_integer():
+                continue
+            best = ((dist, rank, s), val)
+    return best[1] if best else None
@@ -1,50 +1,15 @@
 from selectolax.parser import HTMLParser
 from .utils import fetch_first_ok, absolute_link, hostname
 from .browser import fetch_dynamic
+from .extract import AliasMatcher, extract_labeled, find_near
+from .document import as_doc
+from .structured import embedded_fields, complete, wp_listing_fields
+from .tiered import fetch_parsed
 import re
 
 AMOUNT_RE = re.compile(r'(?:(?:C\$|\$)\s*)?(\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?')
 INT_RE    = re.compile(r'\b(\d{1,2})\b')  # ops rarely > 12
 
-def _find_amount_near(txt: str, keywords, window=140, min_val=None, max_val=None):
-    t = txt.lower()
-    for kw in keywords:
-        i = t.find(kw)
-        if i != -1:
-            lo = max(0, i - 20); hi = min(len(t), i + len(kw) + window)
-            m = AMOUNT_RE.search(t[lo:hi])
-            if m:
-                raw = m.group(1).replace(',', '')
-                try:
-                    val = float(raw)
-                    if min_val is not None and val < min_val: 
-                        continue
-                    if max_val is not None and val > max_val: 
-                        continue
-                    return val
-                except:
-                    pass
-    return None
-
-def _find_int_near(txt: str, keywords, window=100, min_val=None, max_val=None):
-    t = txt.lower()
-    for kw in keywords:
-        i = t.find(kw)
-        if i != -1:
-            lo = max(0, i - 20); hi = min(len(t), i + len(kw) + window)
-            m = INT_RE.search(t[lo:hi])
-            if m:
-                try:
-                    val = float(m.group(1))
-                    if min_val is not None and val < min_val: 
-                        continue
-                    if max_val is not None and val > max_val: 
-                        continue
-                    return val
-                except:
-                    pass
-    return None
-
 PROV_CODES = ['ON','BC','AB','SK','MB','NB','NS','NL','PE','YT','NT','NU']
 def _guess_province(txt: str):
     t = txt.upper()
@@ -53,35 +18,52 @@ def _guess_province(txt: str):
             return code
     return ""
 
-def extract_fields_from_html(html: str):
-    root = HTMLParser(html)
-    txt = root.text(separator=' ').strip()
-
-    # Money fields (CAD) – guard: must be >= 10,000
-    asking = _find_amount_near(txt, ['asking price','asking','list price','price'], min_val=10000)
-    revenue= _find_amount_near(txt, ['collections','revenue','sales','turnover','gross'], min_val=10000)
-    ebitda = _find_amount_near(txt, ['ebitda','sde','net income'], min_val=10000)
-
-    # Ops: typically between 2 and 20
-    ops    = _find_int_near(txt,   ['operatories','operatory','ops','chairs','treatment rooms'], min_val=1, max_val=20)
-
-    # Sqft: typically 400–10,000
-    sqft   = _find_amount_near(txt, ['sq ft','sqft','square feet','area','size'], min_val=400, max_val=10000)
-
-    prov   = _guess_province(txt)
+KEYWORDS = {
+    "asking_price":  ['asking price','asking','list price','price'],
+    "collections":   ['collections','revenue','sales','turnover','gross'],
+    "ebitda_or_sde": ['ebitda','sde','net income'],
+    "equipped_ops":  ['operatories','operatory','ops','chairs','treatment rooms'],
+    "sqft":          ['sq ft','sqft','square feet','area','size'],
+}
+# money (CAD) must be >= 10,000; ops typically 1-20; sqft typically 400-10,000
+RANGES = {
+    "asking_price": (10000, None), "collections": (10000, None), "ebitda_or_sde": (10000, None),
+    "equipped_ops": (1, 20), "sqft": (400, 10000),
+}
+MATCHER = AliasMatcher(KEYWORDS)
+# proximity windows (chars after the keyword); ops values sit right next to their label
+WINDOWS = {"equipped_ops": 100}
+
+def _dom_value(field, source, label, value):
+    rx = INT_RE if field == "equipped_ops" else AMOUNT_RE
+    m = rx.search((value or label).lower())
+    return float(m.group(1).replace(',', '')) if m else None
+
+def extract_fields_from_html(html, url: str = ""):
+    doc = as_doc(html, url)
+    # JSON-LD / microdata / OpenGraph first; the DOM only fills what they lack
+    known = embedded_fields(doc, MATCHER, RANGES)
+    if complete(known, MATCHER):
+        return {**known, "province": known.get("province") or _guess_province(doc.text)}
+    # labelled facts (dl / table / strong labels) first, in one DOM walk
+    out = extract_labeled(doc.root, MATCHER, _dom_value, sources=("dl", "table", "label"), ranges=RANGES)
+    out.update(known)
+
+    # proximity search over the page text for anything still missing
+    for field, kws in KEYWORDS.items():
+        if out[field] is not None:
+            continue
+        lo, hi = RANGES[field]
+        out[field] = find_near(doc, kws, before=20, after=WINDOWS.get(field, 140), lo=lo, hi=hi,
+                               integer=field == "equipped_ops", stops=MATCHER.aliases)
 
-    return {
-        "asking_price": asking,
-        "collections": revenue,
-        "ebitda_or_sde": ebitda,
-        "equipped_ops": ops,
-        "sqft": sqft,
-        "province": prov
-    }
+    out["province"] = known.get("province") or _guess_province(doc.text)
+    return out
 
 def scrape_index_and_details(candidates, link_filter_substrings=None,
                              wait_selector_index=None, wait_selector_detail=None,
-                             max_links=30, broker_name=""):
+                             max_links=30, broker_name="", readiness_detail=None,
+                             required_fields=("asking_price",)):
     # 1) index page (static first, dynamic fallback if few links)
     html, used = fetch_first_ok(candidates)
     root = HTMLParser(html)
@@ -115,11 +97,23 @@ def scrape_index_and_details(candidates, link_filter_substrings=None,
         dedup.append(u)
     dedup = dedup[:max_links]
 
+    rows, _ = scrape_details(dedup, broker_name, required_fields, wait_selector_detail, readiness_detail)
+    return rows
+
+def scrape_details(urls, broker_name="", required_fields=("asking_price",),
+                   wait_selector_detail=None, readiness_detail=None):
+    """Fetch and parse detail pages; returns (rows, urls that were fetched and parsed)."""
+    urls = list(urls)
+    parsed = fetch_parsed(urls, extract_fields_from_html, required_fields,
+                          wait_selector_detail or "body", readiness=readiness_detail,
+                          known=wp_listing_fields(urls, extract_fields_from_html))
+    done = [u for u, fields in zip(urls, parsed) if fields is not None]
+
     rows = []
-    for url in dedup:
+    for url, fields in zip(urls, parsed):
+        if fields is None:
+            continue
         try:
-            dh = fetch_dynamic(url, wait_selector_detail or "body")
-            fields = extract_fields_from_html(dh)
 
             # Sanity: must have at least one economic field (asking/collections/ebitda)
             if not any([fields.get("asking_price"), fields.get("collections"), fields.get("ebitda_or_sde")]):
@@ -149,4 +143,4 @@ def scrape_index_and_details(candidates, link_filter_substrings=None,
             "equipped_ops": r.get("equipped_ops"),
             "sqft": r.get("sqft"),
         })
-    return final
+    return final, done
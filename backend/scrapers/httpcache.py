@@ -0,0 +1,101 @@
+"""On-disk conditional-GET cache: validators + body hash + last parsed fields, keyed by URL."""
+import hashlib
+import json
+import threading
+from datetime import datetime, timezone
+
+from .utils import DATA_DIR
+
+CACHE_JSON = DATA_DIR / "http_cache.json"
+
+def body_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+def parser_key(parse) -> str:
+    return f"{getattr(parse, '__module__', '')}.{getattr(parse, '__qualname__', repr(parse))}"
+
+class ResponseCache:
+    """Per-URL ETag / Last-Modified / content hash plus the fields parsed from that body.
+
+    A 304, or a 200 whose body hashes the same as last time, reuses the stored
+    fields without re-parsing. Entries are tied to the parser that produced
+    them so a different adapter never gets another one's output.
+    """
+
+    def __init__(self, path=CACHE_JSON):
+        self.path = path
+        self._entries = None
+        self._lock = threading.Lock()
+        self.stats = {"hit": 0, "miss": 0, "not_modified": 0, "skipped": 0}
+
+    @property
+    def entries(self) -> dict:
+        if self._entries is None:
+            try:
+                self._entries = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def reset_stats(self):
+        self.stats = {"hit": 0, "miss": 0, "not_modified": 0, "skipped": 0}
+
+    def cached_fields(self, url, parser):
+        """Stored fields for a page known to be unchanged (no request made), or None."""
+        e = self._entry(url, parser)
+        if e is None:
+            return None
+        with self._lock:
+            self.stats["skipped"] += 1
+        return dict(e["fields"])
+
+    def _entry(self, url, parser):
+        e = self.entries.get(url)
+        return e if e and e.get("parser") == parser and e.get("fields") is not None else None
+
+    def validators(self, url, parser) -> dict:
+        e = self._entry(url, parser)
+        if not e:
+            return {}
+        h = {}
+        if e.get("etag"):
+            h["If-None-Match"] = e["etag"]
+        if e.get("last_modified"):
+            h["If-Modified-Since"] = e["last_modified"]
+        return h
+
+    def reuse(self, url, parser, response):
+        """Stored fields if `response` shows the page is unchanged, else None (counts a miss)."""
+        e = self._entry(url, parser)
+        with self._lock:
+            if e and response.status_code == 304:
+                self.stats["not_modified"] += 1
+                return dict(e["fields"])
+            if e and e.get("hash") == body_hash(response.text):
+                self.stats["hit"] += 1
+                return dict(e["fields"])
+            self.stats["miss"] += 1
+        return None
+
+    def store(self, url, parser, response, fields):
+        """Remember `fields` for `url`; `response` is None for browser-only pages (no validators)."""
+        with self._lock:
+            self.entries[url] = {
+                "parser": parser,
+                "etag": response.headers.get("etag") if response is not None else None,
+                "last_modified": response.headers.get("last-modified") if response is not None else None,
+                "hash": body_hash(response.text) if response is not None else None,
+                "fetched_at": datetime.now(timezone.utc).isoformat(),
+                "fields": fields,
+            }
+
+    def save(self):
+        with self._lock:
+            if self._entries is None:
+                return
+            self.path.parent.mkdir(exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self._entries), encoding="utf-8")
+            tmp.replace(self.path)
+
+RESPONSE_CACHE = ResponseCache()
@@ -1,5 +1,6 @@
-from .generic_detail import scrape_index_and_details
-from .utils import fetch_sitemap_urls
+from .generic_detail import scrape_index_and_details, scrape_details
+from .sitemap import fetch_sitemap_entries, SitemapState
+from .browser import Readiness
 
 CANDIDATES = [
     "https://www.mbcbrokerage.ca/listings/?type=dental",
@@ -11,28 +12,33 @@ SITEMAPS = [
     "https://www.mbcbrokerage.ca/post-sitemap.xml",
 ]
 LINK_FILTERS = ["/listings", "/dental", "/practice", "/property", "/for-sale"]
+DETAIL_READINESS = Readiness(network_idle=True, dom_quiet_ms=400, max_wait_ms=4000)
+MAX_SITEMAP_DETAILS = 40  # per run; the rest stay "changed" and are picked up next time
 
-def scrape():
+def scrape(incremental=True):
     rows = scrape_index_and_details(
         candidates=CANDIDATES,
         link_filter_substrings=LINK_FILTERS,
         wait_selector_index="a",
         wait_selector_detail="body",
         max_links=40,
-        broker_name="MBC"
+        broker_name="MBC",
+        readiness_detail=DETAIL_READINESS,
     )
     if len(rows) < 2:
-        urls = fetch_sitemap_urls(SITEMAPS)
-        extra = scrape_index_and_details(
-            candidates=urls[:40] or ["https://www.mbcbrokerage.ca/"],
-            link_filter_substrings=LINK_FILTERS,
-            wait_selector_index="a",
-            wait_selector_detail="body",
-            max_links=40,
-            broker_name="MBC"
-        )
+        entries = fetch_sitemap_entries(SITEMAPS)
+        if not entries:
+            return rows
+        state = SitemapState("MBC")
+        lastmod = dict(entries)
+        # incremental: only pages new or modified since the last good run
+        urls = state.changed(entries) if incremental else list(lastmod)
+        urls = [u for u in urls if any(s in u for s in LINK_FILTERS)][:MAX_SITEMAP_DETAILS]
+        extra, done = scrape_details(urls, "MBC", wait_selector_detail="body", readiness_detail=DETAIL_READINESS)
         seen=set(r["url"] for r in rows)
         for r in extra:
             if r["url"] not in seen:
                 rows.append(r); seen.add(r["url"])
+        # only what was actually fetched and parsed counts as seen; the rest is retried
+        state.commit([(u, lastmod[u]) for u in done])
     return rows
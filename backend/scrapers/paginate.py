@@ -0,0 +1,93 @@
+"""Concurrent, early-stopping crawl of a paginated archive rendered in Chromium.
+
+Page 1 is rendered alone; its pagination widget gives the last page number.
+The remaining pages are rendered in concurrent batches and read in page
+order. Crawling stops at the first page with nothing new, and, when `known`
+holds the listings seen last run, at the first page made up only of them.
+"""
+import re
+from dataclasses import dataclass, field
+
+from selectolax.parser import HTMLParser
+
+from .browser import render_many, DEFAULT_CONCURRENCY
+
+PAGINATION_LINKS = "a.page-numbers, .elementor-pagination a, .pagination a, .nav-links a, a.page-link"
+RX_PAGE_NUM = re.compile(r'/page/(\d+)/?(?:[?#]|$)|[?&](?:paged|page|e-page-[\w-]+)=(\d+)')
+
+def last_page(doc: HTMLParser):
+    """Highest page number linked from the archive's pagination widget, or None without one."""
+    best = None
+    for a in doc.css(PAGINATION_LINKS):
+        m = RX_PAGE_NUM.search(a.attributes.get("href") or "")
+        n = int(m.group(1) or m.group(2)) if m else None
+        label = a.text(strip=True).replace(",", "")
+        if label.isdigit():
+            n = max(n or 0, int(label))
+        if n is not None:
+            best = n if best is None else max(best, n)
+    return best
+
+@dataclass
+class Crawl:
+    items: list = field(default_factory=list)
+    pages: int = 0           # pages rendered
+    last_page: int | None = None
+    failed: list = field(default_factory=list)  # page numbers whose render failed
+    complete: bool = False   # read every page to the end of the archive (no early stop, no failures)
+
+def paginate(page_url, parse, max_pages=20, known=None, concurrency=DEFAULT_CONCURRENCY,
+             wait_selector="body", readiness=None, key=lambda item: item[0]):
+    """Render archive pages page_url(1), page_url(2), ... and collect parse(doc, url) items.
+
+    Each page is parsed once (selectolax HTMLParser) and `doc` is shared with
+    the pagination read. `parse` returns the page's new items (it is handed
+    pages in order, so it can de-duplicate across them). With `known` (a set of item keys), the
+    crawl stops at the first page whose items are all in it; while the
+    previous page already had known items the next page is rendered on its
+    own, since it is likely the last one needed. A full crawl with a known
+    last page renders all remaining pages in one go. A page that fails to
+    render is skipped and listed in `failed`; the crawl is then not complete.
+    """
+    crawl = Crawl()
+    html = render_many([page_url(1)], wait_selector, readiness=readiness)[0]
+    crawl.pages = 1
+    if html is None:
+        return crawl
+    doc = HTMLParser(html)
+    crawl.last_page = last_page(doc)
+    end = min(crawl.last_page or max_pages, max_pages)
+
+    page, pending = 1, [(1, doc)]
+    while True:
+        saw_known = False
+        for n, doc in pending:
+            if doc is None:
+                if crawl.last_page is None:
+                    return crawl  # no widget to go by: a failed page ends the archive
+                crawl.failed.append(n)
+                continue
+            items = parse(doc, page_url(n))
+            if not items:
+                crawl.complete = not crawl.failed
+                return crawl
+            crawl.items += items
+            old = [i for i in items if known and key(i) in known]
+            if len(old) == len(items):
+                print(f"[SCRAPER] archive page {n}: only known listings, stopping")
+                return crawl
+            saw_known = saw_known or bool(old)
+        if page >= end:
+            crawl.complete = not crawl.failed
+            return crawl
+        if known is None and crawl.last_page is not None:
+            batch = end - page  # nothing can stop the crawl early: one browser for the rest
+        else:
+            batch = 1 if saw_known else concurrency
+        nums = list(range(page + 1, min(end, page + batch) + 1))
+        rendered = render_many([page_url(n) for n in nums], wait_selector, concurrency=concurrency,
+                               readiness=readiness)
+        crawl.pages += len(nums)
+        page = nums[-1]
+        # parsed as read: pages after an early stop are never parsed
+        pending = ((n, None if h is None else HTMLParser(h)) for n, h in zip(nums, rendered))
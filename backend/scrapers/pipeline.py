@@ -0,0 +1,133 @@
+"""Parse stage: fetchers hand raw HTML to parser processes through a bounded queue.
+
+selectolax + regex extraction is CPU-bound; running it in worker processes
+keeps it from stalling the fetch loop and lets pages parse on every core.
+Parsers must be module-level functions `parse(html, url) -> dict` (picklable).
+
+Parse-only re-runs over saved pages: see scrapers/reparse.py.
+"""
+import asyncio, multiprocessing, os, threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from importlib import import_module
+from pathlib import Path
+
+PARSE_WORKERS = int(os.getenv("SCRAPER_PARSE_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+# pages allowed in flight per stage before fetchers are made to wait
+PARSE_QUEUE = 4 * max(1, PARSE_WORKERS)
+
+PARSERS = {
+    "roi": "scrapers.adapters_roi:parse_roi_detail",
+    "tierthree": "scrapers.adapters_tierthree:parse_tierthree_detail",
+    "generic": "scrapers.generic_detail:extract_fields_from_html",
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    """One pool shared by every broker; spawn, since the parent runs threads and Chromium."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def _run(parse, html, url):
+    # runs in the worker; errors come back as text so one bad page can't poison the batch
+    try:
+        return parse(html, url), None
+    except Exception as e:
+        return None, str(e)
+
+class ParseStage:
+    """Submit (key, html, url) as pages arrive; `results()` waits and hands over key -> fields.
+
+    At most `max_pending` pages are queued or parsing at once: `submit` blocks
+    until a slot frees, which is the backpressure on the fetchers feeding it.
+    Callbacks running on an event loop await `submit_async` instead, which
+    waits for the slot in a thread so the loop keeps serving other requests.
+    With `workers=0` pages are parsed inline (handy when debugging a parser).
+    """
+
+    def __init__(self, parse, max_pending=PARSE_QUEUE, workers=PARSE_WORKERS):
+        self.parse = parse
+        self.inline = workers == 0
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, html, url=""):
+        if not self.inline:
+            self._slots.acquire()
+        self._start(key, html, url)
+
+    async def submit_async(self, key, html, url=""):
+        if not self.inline and not self._slots.acquire(blocking=False):
+            await asyncio.to_thread(self._slots.acquire)
+        self._start(key, html, url)
+
+    def _start(self, key, html, url):
+        # the caller holds a slot (unless inline)
+        if self.inline:
+            with self._lock:
+                self._jobs[key] = (_run(self.parse, html, url), html, url)
+            return
+        try:
+            fut = _get_pool().submit(_run, self.parse, html, url)
+        except (BrokenProcessPool, RuntimeError):
+            self._slots.release()
+            _reset_pool()
+            with self._lock:
+                self._jobs[key] = (_run(self.parse, html, url), html, url)
+            return
+        fut.add_done_callback(lambda _: self._slots.release())
+        with self._lock:
+            self._jobs[key] = (fut, html, url)
+
+    def results(self) -> dict:
+        """Everything submitted since the last call, once parsed."""
+        with self._lock:
+            jobs, self._jobs = self._jobs, {}
+        out = {}
+        for key, (job, html, url) in jobs.items():
+            if not isinstance(job, tuple):
+                try:
+                    job = job.result()
+                except BrokenProcessPool:
+                    # a worker died (e.g. parser segfault); redo this page here, fresh pool next time
+                    _reset_pool()
+                    job = _run(self.parse, html, url)
+            fields, err = job
+            if err is not None:
+                print(f"[SCRAPER] parse fail: {url} -> {err}")
+            out[key] = fields
+        return out
+
+def parse_many(pages, parse, workers=PARSE_WORKERS):
+    """Parse (html, url) pairs; fields (None on failure) in input order."""
+    stage = ParseStage(parse, workers=workers)
+    n = 0
+    for n, (html, url) in enumerate(pages, 1):
+        stage.submit(n - 1, html, url)
+    done = stage.results()
+    return [done.get(i) for i in range(n)]
+
+def load_parser(name: str):
+    """A parser by PARSERS name or as 'module:function'."""
+    mod, _, fn = PARSERS.get(name, name).partition(":")
+    return getattr(import_module(mod), fn)
+
+def reparse_files(paths, parse, workers=PARSE_WORKERS):
+    """Re-run only the parse stage over saved HTML files; [(path, fields)]."""
+    paths = [Path(p) for p in paths]
+    pages = ((p.read_text(encoding="utf-8", errors="replace"), str(p)) for p in paths)
+    return list(zip(paths, parse_many(pages, parse, workers)))
@@ -0,0 +1,168 @@
+"""Per-host politeness shared by the httpx fetchers (utils.py) and Chromium (browser.py).
+
+Each host gets a token bucket whose rate adapts: halved on 429/503 (and
+paused for Retry-After), eased down when responses get slow, and nudged up
+while latency stays healthy. robots.txt is read once per host: Disallow rules
+are honoured and Crawl-delay caps the rate. Waiting for one host's token
+never holds up requests to another host.
+"""
+import asyncio, threading, time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+ROBOTS_AGENT = "RootedBot"
+ROBOTS_TTL_S = 6 * 3600
+
+START_RATE = 2.0     # requests/second before we know anything about a host
+MAX_RATE = 8.0
+MIN_RATE = 0.1
+BURST = 4
+HEALTHY_LATENCY_S = 1.0
+SLOW_LATENCY_S = 4.0
+MAX_RETRY_AFTER_S = 120.0
+THROTTLE_STATUSES = {429, 503}
+
+def retry_after_seconds(value, default=None):
+    """Retry-After header (delta-seconds or HTTP date) -> seconds, capped."""
+    if not value:
+        return default
+    try:
+        secs = float(value)
+    except ValueError:
+        try:
+            secs = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return default
+    return min(max(secs, 0.0), MAX_RETRY_AFTER_S)
+
+class HostBucket:
+    """Token bucket for one host. `reserve()` books the next slot and says how long to wait."""
+
+    def __init__(self, rate=START_RATE, max_rate=MAX_RATE, burst=BURST):
+        self.max_rate = max_rate
+        self.rate = min(rate, max_rate)
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1  # may go negative: later callers queue up behind earlier ones
+            return max(0.0, -self.tokens / self.rate, self.paused_until - now)
+
+    def record(self, status, latency_s, retry_after=None):
+        with self._lock:
+            if status in THROTTLE_STATUSES:
+                self.rate = max(MIN_RATE, self.rate / 2)
+                pause = retry_after if retry_after is not None else 1.0 / self.rate
+                self.paused_until = max(self.paused_until, time.monotonic() + pause)
+                self.tokens = min(self.tokens, 0.0)
+            elif latency_s is not None and latency_s > SLOW_LATENCY_S:
+                self.rate = max(MIN_RATE, self.rate * 0.8)
+            elif latency_s is not None and latency_s < HEALTHY_LATENCY_S and status is not None and status < 400:
+                self.rate = min(self.max_rate, self.rate + 0.25)
+
+    def snapshot(self) -> dict:
+        return {"rate": round(self.rate, 3), "max_rate": round(self.max_rate, 3)}
+
+class Robots:
+    """robots.txt per host (fetched lazily, cached for ROBOTS_TTL_S)."""
+
+    def __init__(self):
+        self._parsers = {}  # origin -> (fetched_at, RobotFileParser)
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _origin_lock(self, origin):
+        with self._lock:
+            return self._locks.setdefault(origin, threading.Lock())
+
+    def parser(self, url) -> RobotFileParser:
+        p = urlparse(url)
+        origin = f"{p.scheme}://{p.netloc}"
+        hit = self._parsers.get(origin)
+        if hit and time.monotonic() - hit[0] < ROBOTS_TTL_S:
+            return hit[1]
+        with self._origin_lock(origin):
+            hit = self._parsers.get(origin)
+            if hit and time.monotonic() - hit[0] < ROBOTS_TTL_S:
+                return hit[1]
+            rp = RobotFileParser(origin + "/robots.txt")
+            from .utils import get_client
+            try:
+                r = get_client().get(rp.url, timeout=10)
+                if r.status_code in (401, 403):
+                    rp.disallow_all = True
+                elif r.status_code >= 400:
+                    rp.allow_all = True  # no robots.txt (or it's broken): nothing is off limits
+                else:
+                    rp.parse(r.text.splitlines())
+            except Exception as e:
+                print(f"[SCRAPER] robots.txt unavailable: {rp.url} -> {e}")
+                rp.allow_all = True
+            self._parsers[origin] = (time.monotonic(), rp)
+            return rp
+
+    def allowed(self, url) -> bool:
+        return self.parser(url).can_fetch(ROBOTS_AGENT, url)
+
+    def crawl_delay(self, url):
+        rp = self.parser(url)
+        delay = rp.crawl_delay(ROBOTS_AGENT)
+        rate = rp.request_rate(ROBOTS_AGENT)
+        if rate is not None and rate.requests:
+            delay = max(delay or 0.0, rate.seconds / rate.requests)
+        return float(delay) if delay else None
+
+class RateLimiter:
+    """Buckets by hostname, created with the host's robots.txt Crawl-delay as a ceiling."""
+
+    def __init__(self, robots=None):
+        self.robots = robots or Robots()
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url) -> HostBucket:
+        host = (urlparse(url).hostname or "").lower()
+        b = self._buckets.get(host)
+        if b is None:
+            delay = self.robots.crawl_delay(url)  # network, so outside the registry lock
+            with self._lock:
+                b = self._buckets.get(host)
+                if b is None:
+                    b = HostBucket(max_rate=1.0 / delay, burst=1) if delay else HostBucket()
+                    self._buckets[host] = b
+        return b
+
+    def allowed(self, url) -> bool:
+        return self.robots.allowed(url)
+
+    def acquire(self, url):
+        """Block until `url`'s host may be hit again (sync callers)."""
+        wait = self.bucket(url).reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, url):
+        bucket = self._buckets.get((urlparse(url).hostname or "").lower())
+        if bucket is None:  # first contact reads robots.txt; keep that off the event loop
+            bucket = await asyncio.to_thread(self.bucket, url)
+        wait = bucket.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+    def record(self, url, status, latency_s, retry_after_header=None):
+        self.bucket(url).record(status, latency_s, retry_after_seconds(retry_after_header))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {h: b.snapshot() for h, b in self._buckets.items()}
+
+LIMITER = RateLimiter()
@@ -0,0 +1,13 @@
+"""Re-run only the parse stage over saved HTML, without fetching anything.
+
+    python -m scrapers.reparse roi debug_out/*.html
+"""
+import json, sys
+
+from .pipeline import PARSERS, load_parser, reparse_files
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit(f"usage: python -m scrapers.reparse {{{'|'.join(PARSERS)}|module:function}} FILE.html...")
+    for path, fields in reparse_files(sys.argv[2:], load_parser(sys.argv[1])):
+        print(json.dumps({"file": str(path), "fields": fields}))
@@ -0,0 +1,44 @@
+"""Regenerate scraped_listings.csv from the HTML archive, with no network.
+
+Every broker runs exactly as in a live scrape, but fetches are answered from
+data/archive (see archive.py), the response cache, sitemap state and tier map
+are left alone, and pages are parsed by the current adapters in the parse pool.
+
+    python -m scrapers.replay                       # all brokers -> data/scraped_listings.csv
+    python -m scrapers.replay --broker ROI --out /tmp/roi.csv
+"""
+import argparse, time
+from pathlib import Path
+
+from .archive import ARCHIVE
+from .run import BROKERS, SCRAPED_CSV, _scrape_brokers, combine_frames
+
+def replay(brokers=None, out=SCRAPED_CSV):
+    """Run the named brokers (default: all) against the archive and write their rows to `out`."""
+    chosen = [(name, fn) for name, fn in BROKERS if not brokers or name in brokers]
+    ARCHIVE.replaying = True
+    try:
+        frames, report = _scrape_brokers(chosen)
+    finally:
+        ARCHIVE.replaying = False
+    if not frames:
+        return {"rows": 0, "brokers": report}
+    big = combine_frames(frames)
+    # rows are as old as the page they came from, not the replay
+    fetched = {u: max(kinds.values()) for u, kinds in ARCHIVE.urls().items()}
+    big["scraped_at"] = big["url"].map(fetched).fillna(big["scraped_at"])
+    out.parent.mkdir(parents=True, exist_ok=True)
+    big.to_csv(out, index=False)
+    return {"rows": int(big.shape[0]), "brokers": report}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--broker", action="append", choices=[name for name, _ in BROKERS],
+                    help="replay only this broker (repeatable)")
+    ap.add_argument("--out", type=Path, default=SCRAPED_CSV)
+    args = ap.parse_args()
+    t0 = time.perf_counter()
+    summary = replay(args.broker, args.out)
+    print(f"[REPLAY] {summary['rows']} rows -> {args.out} in {time.perf_counter() - t0:.1f}s")
+    for name, rep in summary["brokers"].items():
+        print(f"[REPLAY] {name}: {rep}")
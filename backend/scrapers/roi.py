@@ -1,5 +1,8 @@
-from .utils import fetch_first_ok, fetch_sitemap_urls, absolute_link, hostname
-from .browser import fetch_dynamic
+from .utils import fetch_first_ok, absolute_link, hostname
+from .sitemap import fetch_sitemap_entries, SitemapState
+from .browser import fetch_dynamic, Readiness
+from .tiered import fetch_parsed
+from .structured import wp_listing_fields
 from selectolax.parser import HTMLParser
 from .adapters_roi import parse_roi_detail
 
@@ -14,6 +17,12 @@ SITEMAPS = [
     "https://www.roicorp.com/post-sitemap.xml",
 ]
 
+# listing facts live in Elementor text blocks / dl / tables; stop waiting once one is attached
+DETAIL_READINESS = Readiness(selector=".elementor-widget-text-editor, dl, table", dom_quiet_ms=400, max_wait_ms=4000)
+# a static GET is enough when it already carries these; otherwise the page is rendered
+REQUIRED_FIELDS = ("asking_price", "collections")
+INDEX_READINESS = Readiness(selector="a[href*='/listings/']", network_idle=True, max_wait_ms=5000)
+
 def _clean_row(r):
     # sanity ranges
     if r.get("collections") is not None and r["collections"] < 100000:
@@ -26,14 +35,15 @@ def _clean_row(r):
         r["equipped_ops"] = None
     return r
 
+def _links(html):
+    return [a.attributes.get("href","") for a in HTMLParser(html).css("a")] or []
+
 def _detail_urls_from_index():
+    # first candidate that answers wins (fetch_first_ok races them); raises if none does
     html, used = fetch_first_ok(INDEX_CANDIDATES)
-    root = HTMLParser(html)
-    links = [a.attributes.get("href","") for a in root.css("a")] or []
+    links = _links(html)
     if len(links) < 5:
-        html = fetch_dynamic(used, "a")
-        root = HTMLParser(html)
-        links = [a.attributes.get("href","") for a in root.css("a")] or []
+        links = _links(fetch_dynamic(used, "a", readiness=INDEX_READINESS))
     out = []
     for href in links:
         u = absolute_link(used, href)
@@ -43,20 +53,28 @@ def _detail_urls_from_index():
     # de-dupe
     return list(dict.fromkeys(out))
 
-def scrape():
+def scrape(incremental=True):
     # 1) try sitemap (best source of real listing URLs)
-    urls = fetch_sitemap_urls(SITEMAPS)
-    detail_urls = [u for u in urls if "/listings/" in u and "#" not in u and not u.rstrip("/").endswith("/listings")]
+    entries = [(u, lm) for u, lm in fetch_sitemap_entries(SITEMAPS)
+               if "/listings/" in u and "#" not in u and not u.rstrip("/").endswith("/listings")]
+    state = SitemapState("ROI")
+    # unchanged lastmod since the last good run: reuse the cached row instead of re-fetching
+    unchanged = state.unchanged(entries) if incremental else []
+    detail_urls = [u for u, _ in entries]
     # 2) add index-derived links (some listings may not be in sitemap)
     detail_urls += _detail_urls_from_index()
     # de-dupe
     detail_urls = list(dict.fromkeys(detail_urls))
 
+    targets = detail_urls[:80]  # cap for politeness
+    parsed = fetch_parsed(targets, parse_roi_detail, REQUIRED_FIELDS, "body", readiness=DETAIL_READINESS,
+                          unchanged=unchanged, known=wp_listing_fields(targets, parse_roi_detail))
+
     rows = []
-    for url in detail_urls[:80]:  # cap for politeness
+    for url, fields in zip(targets, parsed):
+        if fields is None:
+            continue
         try:
-            html = fetch_dynamic(url, "body")
-            fields = parse_roi_detail(html)
             # must have at least one econ signal:
             if not any([fields.get("asking_price"), fields.get("collections"), fields.get("ebitda_or_sde")]):
                 continue
@@ -75,4 +93,5 @@ def scrape():
         except Exception as e:
             print(f"[SCRAPER] ROI detail fail: {url} -> {e}")
             continue
+    state.commit(entries)
     return rows
@@ -1,17 +1,28 @@
-from pathlib import Path
 from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+import contextvars, threading, time
 import pandas as pd
 
 from .roi import scrape as scrape_roi
 from .tierthree import scrape as scrape_tierthree
 from .mbc import scrape as scrape_mbc
+from .utils import DATA_DIR, BrokerCancelled, bind_cancel_event
+from .httpcache import RESPONSE_CACHE
+from .ratelimit import LIMITER
+from .breaker import BREAKER
+from .browser import SHARED_BROWSER
+from . import db
 
-DATA_DIR = Path("data")
 DATA_DIR.mkdir(exist_ok=True)
 
 SCRAPED_CSV = DATA_DIR / "scraped_listings.csv"
 APPRAISAL_CSV = DATA_DIR / "appraisal_dataset.csv"
 
+BROKERS = [("ROI", scrape_roi), ("TierThree", scrape_tierthree), ("MBC", scrape_mbc)]
+# wall-clock budget per broker, measured from the start of the run
+BROKER_TIMEOUT_S = {"ROI": 30 * 60, "TierThree": 40 * 60, "MBC": 20 * 60}
+DEFAULT_BROKER_TIMEOUT_S = 30 * 60
+
 def _now_iso():
     return datetime.now(timezone.utc).isoformat()
 
@@ -30,18 +41,62 @@ def _to_df(rows):
             df[col] = pd.NA
     return df
 
-def run_all_scrapers():
-    frames = []
-    for name, fn in [("ROI", scrape_roi), ("TierThree", scrape_tierthree), ("MBC", scrape_mbc)]:
+def _timed(fn, cancel=None):
+    t0 = time.perf_counter()
+    def call():
+        if cancel is not None:
+            bind_cancel_event(cancel)
+        return fn()
+    try:
+        # fresh context per broker: pool threads are reused, the cancel flag must not be
+        return contextvars.Context().run(call), None, time.perf_counter() - t0
+    except (Exception, BrokerCancelled) as e:
+        return None, e, time.perf_counter() - t0
+
+def _scrape_brokers(brokers=BROKERS):
+    """Run brokers concurrently; one failing or hanging never blocks the others.
+
+    Brokers spend most of their time waiting on the network/browser, so
+    threads are enough here. Returns (frames in broker order, per-broker report).
+    """
+    frames, report = [], {}
+    ex = ThreadPoolExecutor(max_workers=len(brokers), thread_name_prefix="broker")
+    started = time.perf_counter()
+    cancels = {name: threading.Event() for name, _ in brokers}
+    futures = [(name, ex.submit(_timed, fn, cancels[name])) for name, fn in brokers]
+    for name, fut in futures:
+        timeout = BROKER_TIMEOUT_S.get(name, DEFAULT_BROKER_TIMEOUT_S)
         try:
-            rows = fn()
-            frames.append(_to_df(rows))
-        except Exception as e:
-            print(f"[SCRAPER] {name} error: {e}")
+            rows, err, secs = fut.result(timeout=max(0.0, timeout - (time.perf_counter() - started)))
+        except FuturesTimeout:
+            # stops it at its next request, before it writes any cache or crawl state
+            cancels[name].set()
+            rows, err, secs = None, TimeoutError(f"timed out after {timeout}s"), time.perf_counter() - started
+        if err is not None:
+            print(f"[SCRAPER] {name} error: {err}")
+            report[name] = {"ok": False, "rows": 0, "seconds": round(secs, 1), "error": f"{type(err).__name__}: {err}"}
+            continue
+        frames.append(_to_df(rows))
+        report[name] = {"ok": True, "rows": len(rows or []), "seconds": round(secs, 1), "error": None}
+    # a cancelled broker unwinds at its next request or state write; don't wait for it
+    ex.shutdown(wait=False, cancel_futures=True)
+    return frames, report
 
-    if not frames:
-        return {"added": 0, "total": 0}
+def run_all_scrapers():
+    RESPONSE_CACHE.reset_stats()
+    try:
+        frames, brokers = _scrape_brokers()
+    finally:
+        SHARED_BROWSER.close()  # one Chromium per run, shared by every broker
+    summary = _persist(frames)
+    summary["brokers"] = brokers
+    summary["http_cache"] = dict(RESPONSE_CACHE.stats)
+    summary["rate_limits"] = LIMITER.snapshot()
+    summary["open_circuits"] = BREAKER.snapshot()
+    return summary
 
+def combine_frames(frames):
+    """Broker frames -> one listings frame (deduped by URL) in the scraped CSV's column order."""
     big = pd.concat(frames, ignore_index=True)
     if "url" in big.columns:
         big = big.drop_duplicates(subset=["url"], keep="last")
@@ -51,8 +106,16 @@ def run_all_scrapers():
     for c in cols_order:
         if c not in big.columns:
             big[c] = pd.NA
-    big = big.loc[:, cols_order]
-    big.to_csv(SCRAPED_CSV, index=False)
+    return big.loc[:, cols_order]
+
+def _persist(frames):
+    if not frames:
+        return {"added": 0, "total": 0}
+
+    db.seed_from_history(SCRAPED_CSV, APPRAISAL_CSV)  # first run on an empty database only
+    big = combine_frames(frames)
+    # SQLite is the only store a run writes; CSV/Parquet copies come from scrapers.export
+    listings = db.upsert_listings(big.to_dict(orient="records"))
 
     keep_cols = [c for c in ["province","collections","ebitda_or_sde","equipped_ops","sqft","appraised_value"] if c in big.columns]
     use = big.loc[:, keep_cols].copy()
@@ -65,20 +128,6 @@ def run_all_scrapers():
         all_null = use.drop(columns=[c for c in ["province"] if c in use.columns])
         use = use.loc[~all_null.isna().all(axis=1)].copy()
 
-    if APPRAISAL_CSV.exists():
-        prev = pd.read_csv(APPRAISAL_CSV)
-        for c in set(use.columns) - set(prev.columns):
-            prev[c] = pd.NA
-        for c in set(prev.columns) - set(use.columns):
-            use[c] = pd.NA
-        combined = pd.concat([prev[use.columns], use], ignore_index=True)
-        dedup_keys = [k for k in ["province","collections","ebitda_or_sde","equipped_ops","sqft","appraised_value"] if k in combined.columns]
-        if dedup_keys:
-            combined = combined.drop_duplicates(subset=dedup_keys, keep="last")
-        combined.to_csv(APPRAISAL_CSV, index=False)
-        added = max(0, combined.shape[0] - prev.shape[0])
-        total = combined.shape[0]
-        return {"added": added, "total": total}
-    else:
-        use.to_csv(APPRAISAL_CSV, index=False)
-        return {"added": use.shape[0], "total": use.shape[0]}
+    # dedupe against history in SQLite (unique key) instead of re-reading the whole dataset
+    fresh, total = db.add_appraisals(use.to_dict(orient="records"))
+    return {"added": len(fresh), "total": total, "listings": listings}
@@ -0,0 +1,109 @@
+import gzip, io, json, re, threading
+import xml.etree.ElementTree as ET
+
+from .utils import fetch_many_responses, DATA_DIR, check_cancelled
+from .archive import ARCHIVE
+
+STATE_JSON = DATA_DIR / "sitemap_state.json"
+_state_lock = threading.Lock()
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1].lower()
+
+def parse_sitemap(data: bytes):
+    """Stream one sitemap document (plain or gzipped).
+
+    Returns (kind, [(loc, lastmod)]) where kind is "index" for a <sitemapindex>
+    and "urlset" otherwise.
+    """
+    fh = io.BytesIO(data)
+    if data[:2] == b"\x1f\x8b":
+        fh = gzip.GzipFile(fileobj=fh)
+    kind, out = "urlset", []
+    loc = lastmod = None
+    try:
+        for event, el in ET.iterparse(fh, events=("start", "end")):
+            tag = _local(el.tag)
+            if event == "start":
+                if tag == "sitemapindex":
+                    kind = "index"
+                continue
+            if tag == "loc":
+                loc = (el.text or "").strip()
+            elif tag == "lastmod":
+                lastmod = (el.text or "").strip() or None
+            elif tag in ("url", "sitemap"):
+                if loc:
+                    out.append((loc, lastmod))
+                loc = lastmod = None
+                el.clear()
+    except (ET.ParseError, OSError, EOFError):
+        # broken XML from some WP plugins; fall back to a naive <loc> scan
+        text = data.decode("utf-8", "replace") if data[:2] != b"\x1f\x8b" else ""
+        out = [(u.strip(), None) for u in re.findall(r"<loc>(.*?)</loc>", text, flags=re.IGNORECASE)]
+        if "<sitemapindex" in text.lower():
+            kind = "index"
+    return kind, out
+
+def fetch_sitemap_entries(base_sitemap_urls, max_depth=3):
+    """(url, lastmod) pairs from sitemaps, following nested sitemap indexes."""
+    entries, seen = {}, set()
+    level = list(base_sitemap_urls)
+    for _ in range(max_depth + 1):
+        level = [u for u in dict.fromkeys(level) if u not in seen]
+        if not level:
+            break
+        seen.update(level)
+        nested = []
+        for sm, r in zip(level, fetch_many_responses(level)):
+            if r is None:
+                print(f"[SCRAPER] sitemap FAIL: {sm}")
+                continue
+            kind, items = parse_sitemap(r.content)
+            if kind == "index":
+                nested += [loc for loc, _ in items]
+            else:
+                for loc, lastmod in items:
+                    entries.setdefault(loc, lastmod)
+            print(f"[SCRAPER] sitemap OK: {sm} -> {len(items)} {'sitemaps' if kind == 'index' else 'urls'}")
+        level = nested
+    return list(entries.items())
+
+class SitemapState:
+    """Last-seen lastmod per URL for one broker, persisted in data/sitemap_state.json.
+
+    Call `commit` only after a successful run so a failed crawl is retried in full.
+    Archive replays start from an empty state and never commit.
+    """
+
+    def __init__(self, broker: str, path=STATE_JSON):
+        self.broker = broker
+        self.path = path
+        self.seen = {} if ARCHIVE.replaying else self._read().get(broker, {})
+
+    def _read(self) -> dict:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def is_unchanged(self, url, lastmod) -> bool:
+        # without a lastmod we can't tell, so the URL counts as modified
+        return bool(lastmod) and self.seen.get(url) == lastmod
+
+    def changed(self, entries):
+        return [u for u, lm in entries if not self.is_unchanged(u, lm)]
+
+    def unchanged(self, entries):
+        return [u for u, lm in entries if self.is_unchanged(u, lm)]
+
+    def commit(self, entries):
+        if ARCHIVE.replaying:
+            return
+        check_cancelled()
+        self.seen.update({u: lm for u, lm in entries if lm})
+        with _state_lock:  # other brokers may have committed since we loaded
+            all_state = self._read()
+            all_state[self.broker] = self.seen
+            self.path.parent.mkdir(exist_ok=True)
+            self.path.write_text(json.dumps(all_state, indent=1, sort_keys=True), encoding="utf-8")
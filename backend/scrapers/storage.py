@@ -0,0 +1,108 @@
+"""Columnar (Parquet) copies of scraped listings and the appraisal dataset.
+
+Each dataset is Parquet under data/store/<name>/, hive-partitioned by scrape
+date (and broker for listings). A write only adds new part files; reads load
+only the columns they name.
+
+The SQLite database (db.py) is the source of truth; these datasets are
+exported from it (scrapers/export.py) for analysis, and a store left by older
+runs is imported once into an empty database. pyarrow is optional: without
+it HAVE_ARROW is False and only CSV exports are available.
+"""
+import shutil, uuid
+
+import pandas as pd
+
+from .utils import DATA_DIR
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    HAVE_ARROW = True
+except ImportError:
+    HAVE_ARROW = False
+
+STORE_DIR = DATA_DIR / "store"
+
+NUMERIC = ["asking_price", "collections", "ebitda_or_sde", "equipped_ops", "sqft", "appraised_value"]
+LISTING_COLUMNS = ["broker", "title", "url", "province", "asking_price", "collections",
+                   "ebitda_or_sde", "equipped_ops", "sqft", "scraped_at", "appraised_value"]
+APPRAISAL_COLUMNS = ["province", "collections", "ebitda_or_sde", "equipped_ops", "sqft", "appraised_value"]
+
+def _arrow_type(col):
+    if col in NUMERIC:
+        return pa.float64()
+    if col == "scraped_at":
+        return pa.timestamp("us", tz="UTC")
+    return pa.string()
+
+class ColumnStore:
+    """One Parquet dataset: typed columns, append-only part files, column-pruned reads."""
+
+    def __init__(self, name, columns, partition_by=("scrape_date",), root=STORE_DIR):
+        self.name = name
+        self.columns = list(columns)
+        self.partition_by = list(partition_by)
+        self.path = root / name
+
+    @property
+    def schema(self):
+        cols = self.columns + [c for c in self.partition_by if c not in self.columns]
+        return pa.schema([(c, _arrow_type(c)) for c in cols])
+
+    def exists(self) -> bool:
+        return self.path.exists() and any(self.path.rglob("*.parquet"))
+
+    def _typed(self, df: pd.DataFrame, scraped_at=None) -> pd.DataFrame:
+        out = pd.DataFrame(index=df.index)
+        if "scraped_at" in df.columns:
+            stamp = pd.to_datetime(df["scraped_at"], utc=True, errors="coerce", format="ISO8601")
+        else:
+            stamp = pd.Series(pd.Timestamp(scraped_at or pd.Timestamp.now(tz="UTC")), index=df.index)
+        for c in self.columns:
+            if c in NUMERIC:
+                out[c] = pd.to_numeric(df[c], errors="coerce") if c in df.columns else float("nan")
+            elif c == "scraped_at":
+                out[c] = stamp
+            else:
+                out[c] = df[c].astype("string") if c in df.columns else pd.Series(pd.NA, index=df.index, dtype="string")
+        if "scrape_date" in self.partition_by:
+            out["scrape_date"] = stamp.dt.strftime("%Y-%m-%d").fillna("unknown")
+        for c in self.partition_by:
+            if c != "scrape_date":
+                out[c] = out[c].fillna("unknown")
+        return out
+
+    def append(self, df: pd.DataFrame, scraped_at=None) -> int:
+        """Add rows as new part files; returns the number of rows written."""
+        if df is None or df.empty:
+            return 0
+        table = pa.Table.from_pandas(self._typed(df, scraped_at), schema=self.schema, preserve_index=False)
+        self.path.mkdir(parents=True, exist_ok=True)
+        pq.write_to_dataset(table, self.path, partition_cols=self.partition_by,
+                            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+                            existing_data_behavior="overwrite_or_ignore")
+        return table.num_rows
+
+    def rewrite(self, df: pd.DataFrame, scraped_at=None) -> int:
+        """Replace the whole dataset with `df` (an export, not another run's rows)."""
+        if self.path.exists():
+            shutil.rmtree(self.path)
+        return self.append(df, scraped_at)
+
+    def dataset(self):
+        keys = pa.schema([(c, pa.string()) for c in self.partition_by])
+        return ds.dataset(self.path, format="parquet",
+                          partitioning=ds.partitioning(keys, flavor="hive"))
+
+    def read(self, columns=None) -> pd.DataFrame:
+        """Every row, only `columns` loaded."""
+        if not self.exists():
+            return pd.DataFrame(columns=columns or self.columns)
+        return self.dataset().to_table(columns=columns).to_pandas()
+
+LISTINGS = ColumnStore("listings", LISTING_COLUMNS, partition_by=("scrape_date", "broker"))
+APPRAISALS = ColumnStore("appraisals", APPRAISAL_COLUMNS)
+
+STORES = {"listings": LISTINGS, "appraisals": APPRAISALS}
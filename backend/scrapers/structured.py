@@ -0,0 +1,221 @@
+"""Machine-readable listing facts, tried before regex-mining rendered pages.
+
+Two sources:
+
+* embedded metadata in a page (JSON-LD, schema.org microdata, OpenGraph /
+  product meta tags), read by the adapters before their DOM extraction;
+  fields it can't supply still come from the DOM.
+* the WordPress REST API (all three brokers run WordPress): listing posts are
+  pulled 100 per request and run through the broker's own parser, so a
+  complete listing never needs its page fetched or rendered. Anything
+  incomplete falls through to tiered.fetch_parsed as before.
+"""
+import json, re
+from html import escape
+from urllib.parse import urlparse
+
+from .extract import SANITY_RANGES, in_range
+from .utils import fetch_many_responses
+from .pipeline import parse_many
+
+WP_PER_PAGE = 100
+WP_MAX_PAGES = 10  # per post type: 1,000 records is far beyond any broker's inventory
+WP_TYPE_HINTS = ("listing", "practice", "propert")
+WP_FIELDS = "link,title,content,meta,acf,modified_gmt"
+
+# schema.org / meta-tag names that map to a field directly (lowercased, no spaces)
+SCHEMA_FIELDS = {"price": "asking_price", "floorsize": "sqft", "addressregion": "province",
+                 "product:price:amount": "asking_price", "og:price:amount": "asking_price"}
+PROVINCES = {
+    "ON": "ontario", "BC": "british columbia", "AB": "alberta", "SK": "saskatchewan",
+    "MB": "manitoba", "NB": "new brunswick", "NS": "nova scotia", "NL": "newfoundland",
+    "PE": "prince edward island", "YT": "yukon", "NT": "northwest territories", "NU": "nunavut",
+}
+MAX_VALUE_LEN = 60  # longer strings are prose, not a value
+RX_MONEY = re.compile(r'(-?\d+(?:\.\d+)?)\s*(k|m|thousand|million)?\b', re.I)
+RX_CHUNKS = re.compile(r'\s*[|•;\n]\s*')
+
+def to_number(v):
+    """123 / "123" / "$1,250,000" / "1.2M" / "850K CAD" -> float, else None."""
+    if isinstance(v, bool) or v is None:
+        return None
+    if isinstance(v, (int, float)):
+        return float(v)
+    m = RX_MONEY.search(str(v).replace(",", "").replace("\u00a0", " "))
+    if not m:
+        return None
+    scale = {"k": 1e3, "thousand": 1e3, "m": 1e6, "million": 1e6}.get((m.group(2) or "").lower(), 1)
+    return float(m.group(1)) * scale
+
+def province_code(v) -> str:
+    t = str(v or "").strip()
+    if t.upper() in PROVINCES:
+        return t.upper()
+    t = t.lower()
+    return next((code for code, name in PROVINCES.items() if name in t), "")
+
+def _words(key: str) -> str:
+    # "floorSize" / "asking_price" -> "floor size" / "asking price"
+    return re.sub(r'(?<=[a-z])(?=[A-Z])|[_-]+', " ", key).lower().strip()
+
+def _prose_pairs(text):
+    """'Asking Price: $1.2M | Collections: $900K' -> (label, value) pairs."""
+    for chunk in RX_CHUNKS.split(text or ""):
+        label, sep, value = chunk.partition(":")
+        if sep and label and value:
+            yield label.strip(), value.strip()
+
+def _jsonld_pairs(node, key=""):
+    if isinstance(node, list):
+        for item in node:
+            yield from _jsonld_pairs(item, key)
+    elif isinstance(node, dict):
+        if "name" in node and "value" in node:  # PropertyValue: {"name": "Collections", "value": ...}
+            yield str(node["name"]), node["value"]
+        elif "value" in node and key:            # QuantitativeValue: "floorSize": {"value": 1800}
+            yield key, node["value"]
+        for k, v in node.items():
+            if (k.startswith("@") and k != "@graph") or k in ("name", "value"):
+                continue
+            if k == "description" and isinstance(v, str):
+                yield from _prose_pairs(v)
+            else:
+                yield from _jsonld_pairs(v, k)
+    elif key:
+        yield key, node
+
+def embedded_pairs(doc):
+    """(label, value) from JSON-LD, microdata and OpenGraph/product meta tags, in that order."""
+    for s in doc.root.css('script[type="application/ld+json"]'):
+        try:
+            data = json.loads(s.text(strip=True) or "null")
+        except ValueError:
+            continue
+        yield from _jsonld_pairs(data)
+    for scope in doc.root.css("[itemscope]"):
+        props = {}
+        for n in scope.css("[itemprop]"):
+            attrs = n.attributes
+            props.setdefault(attrs.get("itemprop") or "", attrs.get("content") or n.text(strip=True))
+        if "name" in props and "value" in props:
+            yield props.pop("name"), props.pop("value")
+        yield from props.items()
+    for n in doc.root.css("meta[property], meta[name]"):
+        attrs = n.attributes
+        prop = (attrs.get("property") or attrs.get("name") or "").lower()
+        if prop in ("og:description", "description"):
+            yield from _prose_pairs(attrs.get("content"))
+        elif prop.startswith(("og:", "product:")):
+            yield prop, attrs.get("content")
+
+def embedded_fields(doc, matcher, ranges=SANITY_RANGES) -> dict:
+    """Fields found in the page's structured metadata (only those found).
+
+    Labels are mapped by SCHEMA_FIELDS, then by the adapter's own `matcher`;
+    the first in-range value per field wins.
+    """
+    out = {}
+    for label, value in embedded_pairs(doc):
+        if value is None or isinstance(value, (dict, list)) or len(str(value)) > MAX_VALUE_LEN:
+            continue
+        key = re.sub(r"\s+", "", str(label)).lower()
+        fields = (SCHEMA_FIELDS[key],) if key in SCHEMA_FIELDS else matcher.fields(_words(str(label)))
+        for f in fields:
+            if f in out:
+                continue
+            if f == "province":
+                code = province_code(value)
+                if code:
+                    out[f] = code
+            elif f in matcher.order:
+                num = to_number(value)
+                if num is not None and in_range(f, num, ranges):
+                    out[f] = num
+    return out
+
+def complete(known: dict, matcher) -> bool:
+    """True when metadata covered every field the adapter extracts (DOM can be skipped)."""
+    return all(known.get(f) is not None for f in matcher.order)
+
+def canonical(url: str) -> str:
+    p = urlparse(url)
+    return f"{(p.hostname or '').removeprefix('www.')}{p.path.rstrip('/')}".lower()
+
+def _json(r):
+    if r is None or r.status_code != 200:
+        return None
+    try:
+        return r.json()
+    except ValueError:
+        return None
+
+def wp_posts(origin: str, wanted=None) -> list:
+    """Posts of listing-like types (plus plain posts) from `origin`'s REST API.
+
+    Page 1 of every type goes out together; the remaining pages (per
+    X-WP-TotalPages) follow in one concurrent batch. `wanted`, a set of
+    canonical URLs, drops unrelated posts. [] when the site has no API.
+    """
+    api = f"{origin}/wp-json/wp/v2/"
+    types = _json(fetch_many_responses([api + "types"])[0]) or {}
+    if not isinstance(types, dict):
+        return []
+    bases = [t["rest_base"] for slug, t in types.items()
+             if isinstance(t, dict) and t.get("rest_base") and any(h in slug for h in WP_TYPE_HINTS)]
+    bases.append("posts")
+    page_url = lambda base, n: f"{api}{base}?per_page={WP_PER_PAGE}&page={n}&_fields={WP_FIELDS}"
+    first = fetch_many_responses([page_url(b, 1) for b in bases])
+    more = []
+    for base, r in zip(bases, first):
+        if r is not None and r.status_code == 200:
+            try:
+                total = int(r.headers.get("x-wp-totalpages", 1))
+            except ValueError:
+                total = 1
+            more += [page_url(base, n) for n in range(2, min(total, WP_MAX_PAGES) + 1)]
+    posts = []
+    for r in first + fetch_many_responses(more):
+        batch = _json(r)
+        if isinstance(batch, list):
+            posts += [p for p in batch if isinstance(p, dict) and p.get("link")
+                      and (wanted is None or canonical(p["link"]) in wanted)]
+    return posts
+
+def _rendered(v) -> str:
+    return v.get("rendered", "") if isinstance(v, dict) else str(v or "")
+
+def post_html(post: dict) -> str:
+    """A page the adapters can parse: title, custom fields as a <dl>, then the post body.
+
+    Title and body arrive as rendered HTML; custom fields are raw text and are escaped.
+    """
+    facts = {}
+    for group in ("acf", "meta"):
+        if isinstance(post.get(group), dict):
+            for k, v in post[group].items():
+                if isinstance(v, (str, int, float)) and not isinstance(v, bool) and str(v).strip():
+                    facts.setdefault(_words(k), v)
+    dl = "".join(f"<dt>{escape(k)}</dt><dd>{escape(str(v))}</dd>" for k, v in facts.items())
+    return (f"<html><body><h1>{_rendered(post.get('title'))}</h1>"
+            f"<dl>{dl}</dl>{_rendered(post.get('content'))}</body></html>")
+
+def wp_listing_fields(urls, parse) -> dict:
+    """url -> parse() fields for each of `urls` that its site's REST API serves.
+
+    One post-type discovery call per site, then pages of WP_PER_PAGE posts;
+    each post is parsed by the broker's adapter in the parse pool.
+    """
+    by_origin = {}
+    for u in urls:
+        p = urlparse(u)
+        by_origin.setdefault(f"{p.scheme}://{p.netloc}", {})[canonical(u)] = u
+    out = {}
+    for origin, wanted in by_origin.items():
+        posts = wp_posts(origin, set(wanted))
+        parsed = parse_many(((post_html(p), p["link"]) for p in posts), parse)
+        for post, fields in zip(posts, parsed):
+            if fields is not None:
+                out[wanted[canonical(post["link"])]] = fields
+    if out:
+        print(f"[SCRAPER] wp-json: {len(out)}/{len(urls)} listings from the REST API")
+    return out
@@ -0,0 +1,159 @@
+"""Static-first fetching: plain GET + parse, Chromium only where required fields are missing.
+
+The tier that paid off is remembered per host/first path segment in data/fetch_tiers.json.
+"""
+import json, threading
+from urllib.parse import urlparse
+
+from .utils import fetch_many_responses, DATA_DIR, check_cancelled
+from .browser import render_many, DEFAULT_RESOURCES
+from .httpcache import RESPONSE_CACHE, parser_key
+from .pipeline import ParseStage
+from .archive import ARCHIVE
+
+TIERS_JSON = DATA_DIR / "fetch_tiers.json"
+_tiers_lock = threading.Lock()
+
+def url_pattern(url: str) -> str:
+    p = urlparse(url)
+    seg = next((s for s in p.path.split("/") if s), "")
+    return f"{(p.hostname or '').removeprefix('www.')}/{seg}"
+
+def _load_tiers() -> dict:
+    try:
+        return json.loads(TIERS_JSON.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+def _save_tiers(updates: dict):
+    # brokers run concurrently: merge into whatever is on disk now
+    with _tiers_lock:
+        tiers = _load_tiers()
+        tiers.update(updates)
+        TIERS_JSON.parent.mkdir(exist_ok=True)
+        TIERS_JSON.write_text(json.dumps(tiers, indent=1, sort_keys=True), encoding="utf-8")
+
+def _filled(fields) -> int:
+    return sum(1 for v in (fields or {}).values() if v not in (None, ""))
+
+def _complete(fields, required) -> bool:
+    return fields is not None and all(fields.get(k) not in (None, "") for k in required)
+
+def fetch_parsed(urls, parse, required=(), wait_selector="body", readiness=None,
+                 resources=DEFAULT_RESOURCES, cache=RESPONSE_CACHE, unchanged=(), known=None):
+    """Fetch and parse `urls`, escalating to Chromium only where needed.
+
+    `parse(html, url)` returns a fields dict; a page is complete when every
+    field in `required` is non-empty. Static GETs are conditional against
+    `cache`; unchanged pages reuse their previously extracted fields. URLs in
+    `unchanged` (e.g. same sitemap lastmod as last run) are served from the
+    cache without any request. `known` maps URL -> fields already extracted
+    elsewhere (structured.wp_listing_fields); complete ones are not fetched,
+    the rest fall through to the static/dynamic tiers. Pages are parsed in worker processes as they
+    arrive (see pipeline.ParseStage). Returns parsed fields in input order
+    (None where neither tier produced anything).
+    """
+    urls = list(urls)
+    tiers = _load_tiers()
+    pkey = parser_key(parse)
+    if ARCHIVE.replaying:
+        cache = None  # replays exist to re-run the parser; never hand back stored fields
+
+    results = {}
+    if cache and unchanged:
+        unchanged = set(unchanged)
+        for u in urls:
+            if u in unchanged:
+                fields = cache.cached_fields(u, pkey)
+                if fields is not None:
+                    results[u] = fields
+    skipped = len(results)
+    for u in urls:
+        fields = (known or {}).get(u)
+        if u not in results and _complete(fields, required):
+            results[u] = fields
+    structured = len(results) - skipped
+
+    # patterns that needed the browser last run go straight to it, except one static probe each
+    static_urls, dynamic_urls, probed = [], [], set()
+    for u in urls:
+        if u in results:
+            continue
+        pat = url_pattern(u)
+        if tiers.get(pat) == "dynamic" and pat in probed:
+            dynamic_urls.append(u)
+        else:
+            static_urls.append(u)
+            probed.add(pat)
+
+    outcome = {}  # pattern -> [static complete, escalations that helped]
+    validators = {u: cache.validators(u, pkey) for u in static_urls} if cache else {}
+    responses, to_store = {}, {}
+    stage = ParseStage(parse)
+
+    async def on_static(i, r):
+        u = static_urls[i]
+        responses[u] = r
+        if r is None:
+            return
+        prev = cache.reuse(u, pkey, r) if cache else None
+        if prev is not None:
+            results[u] = prev
+            return
+        if r.status_code == 304:
+            return  # validators sent but entry vanished; rendered below
+        to_store[u] = r
+        await stage.submit_async(("static", u), r.text, u)
+
+    fetch_many_responses(static_urls, extra_headers=validators, on_response=on_static)
+    parsed = stage.results()
+    for u in static_urls:
+        if u in results:
+            continue
+        r = responses.get(u)
+        if r is None or r.status_code == 304:  # 304: validators sent but entry vanished; render instead
+            dynamic_urls.append(u)
+            results[u] = None
+            continue
+        fields = parsed.get(("static", u))
+        results[u] = fields
+        if _complete(fields, required):
+            outcome.setdefault(url_pattern(u), [0, 0])[0] += 1
+        else:
+            dynamic_urls.append(u)
+
+    escalated = [u for u in dynamic_urls if u in results]
+
+    async def on_render(i, html):
+        if html is not None:
+            await stage.submit_async(("render", dynamic_urls[i]), html, dynamic_urls[i])
+
+    render_many(dynamic_urls, wait_selector, readiness=readiness, resources=resources, on_result=on_render)
+    parsed = stage.results()
+    rendered = set()
+    for u in dynamic_urls:
+        fields = parsed.get(("render", u))
+        if fields is None:
+            continue
+        rendered.add(u)
+        if u in results and _filled(fields) > _filled(results[u]):
+            outcome.setdefault(url_pattern(u), [0, 0])[1] += 1
+        if _filled(fields) >= _filled(results.get(u)):
+            results[u] = fields
+        to_store.setdefault(u, None)
+
+    check_cancelled()  # a broker past its deadline must not write shared state
+    if cache:
+        for u, r in to_store.items():
+            # incomplete static fields whose render failed would be reused as-is until the page changed
+            if u in rendered or _complete(results.get(u), required):
+                cache.store(u, pkey, r, results[u])
+        cache.save()
+
+    if outcome and not ARCHIVE.replaying:
+        _save_tiers({pat: "dynamic" if dynamic_helped > static_ok else "static"
+                     for pat, (static_ok, dynamic_helped) in outcome.items()})
+
+    print(f"[SCRAPER] tiered fetch: {len(urls)} urls, unchanged={skipped}, structured={structured}, static={len(static_urls)}, "
+          f"escalated={len(escalated)}, dynamic-first={len(dynamic_urls) - len(escalated)}")
+    return [results.get(u) for u in urls]
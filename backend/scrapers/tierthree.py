@@ -1,10 +1,25 @@
-from .utils import absolute_link
-from .browser import fetch_dynamic
+import json
+from datetime import datetime, timezone
+
+from .utils import absolute_link, DATA_DIR, check_cancelled
+from .browser import Readiness, ResourcePolicy, DEFAULT_RESOURCES
+from .archive import ARCHIVE as ARCHIVE_STORE
+from .paginate import paginate
+from .tiered import fetch_parsed
+from .structured import wp_listing_fields
 from .adapters_tierthree import parse_tierthree_detail
 from selectolax.parser import HTMLParser
 import re
 
 ARCHIVE = "https://tierthree.ca/listing-status/for-sale/"
+TILES_JSON = DATA_DIR / "tierthree_tiles.json"
+FULL_CRAWL_EVERY_S = 7 * 24 * 3600
+
+ARCHIVE_READINESS = Readiness(selector="a[href*='/listings/']", network_idle=True, max_wait_ms=5000)
+DETAIL_READINESS = Readiness(selector=".elementor-icon-list-item, dl, table", dom_quiet_ms=400, max_wait_ms=4000)
+# Elementor ships several large stylesheets per page; detail facts don't depend on layout
+DETAIL_RESOURCES = ResourcePolicy(block_types=DEFAULT_RESOURCES.block_types | {"stylesheet"})
+REQUIRED_FIELDS = ("collections",)
 
 RX_APPRAISED = re.compile(r'apprais(?:ed|al)\s*value', re.I)
 RX_LISTING_PRICE = re.compile(r'(?:practice\s*)?listing\s*price|^price$', re.I)
@@ -24,90 +39,186 @@ def _to_num_money(s: str):
     m = re.search(r'(?:C\$|\$|CAD)?\s*(\d+(?:\.\d+)?)', t, re.I)
     return float(m.group(1)) if m else None
 
-def _extract_label_value_in_tile(tile):
-    """Return (ask_from_tile, app_from_tile) by pairing label/value in same or sibling nodes."""
-    ask_val = None
-    app_val = None
-
-    # scan common item containers (Elementor icon lists, short text, paragraphs)
-    nodes = tile.css(".elementor-icon-list-item, .elementor-post__excerpt, .elementor-widget-text-editor, li, p, div, span, strong, b")
-    for node in nodes:
-        text = node.text(separator=" ", strip=True) or ""
-
-        # same-node capture
-        if RX_APPRAISED.search(text) and app_val is None:
-            m = re.search(r'(?:C\$|\$|CAD)?\s*([\d,\.]+(?:\s*[kKmM]|(?:\s*(?:million|thousand)))?)', text)
-            if m:
-                v = _to_num_money(m.group(1))
-                if v and v >= 100_000:
-                    app_val = v
-
-        if RX_LISTING_PRICE.search(text) and ask_val is None:
-            m = re.search(r'(?:C\$|\$|CAD)?\s*([\d,\.]+(?:\s*[kKmM]|(?:\s*(?:million|thousand)))?)', text)
-            if m:
-                v = _to_num_money(m.group(1))
-                if v and v >= 100_000:
-                    ask_val = v
-
-        # sibling capture (value rendered adjacent)
-        if (RX_APPRAISED.search(text) and app_val is None) or (RX_LISTING_PRICE.search(text) and ask_val is None):
-            # siblings within the parent container often hold the numeric value
-            parent = node.parent
-            if parent:
-                for s in parent.css("span,div,strong,b,em,a"):
-                    valtxt = s.text(strip=True)
-                    if not valtxt:
-                        continue
-                    if RX_APPRAISED.search(valtxt) or RX_LISTING_PRICE.search(valtxt):
-                        continue
-                    v = _to_num_money(valtxt)
-                    if v and v >= 100_000:
-                        if RX_APPRAISED.search(text) and app_val is None:
-                            app_val = v
-                            break
-                        if RX_LISTING_PRICE.search(text) and ask_val is None:
-                            ask_val = v
-                            break
-
-    return ask_val, app_val
-
-def _collect_archive_tiles(max_pages=20):
-    """Return list of (url, title, ask_from_tile, app_from_tile)."""
-    rows = []
-    seen = set()
-    for page in range(1, max_pages + 1):
-        page_url = ARCHIVE if page == 1 else f"{ARCHIVE}page/{page}/"
-        html = fetch_dynamic(page_url, "body")
-        root = HTMLParser(html)
-
-        tiles = root.css("article, .elementor-post, .e-loop-item, .elementor-grid-item, .post")
-        if not tiles:
-            tiles = root.css("div")
-
-        found_any = False
-        for tile in tiles:
-            a = tile.css_first("a")
-            if not a:
-                continue
-            href = a.attributes.get("href", "")
-            u = absolute_link(page_url, href)
-            if not u or "/listings/" not in u or u.rstrip("/").endswith("/listings"):
-                continue
-            if u in seen:
-                continue
+TILE_SELECTORS = ("article", ".elementor-post", ".e-loop-item", ".elementor-grid-item", ".post")
+RX_MONEY = re.compile(r'(?:C\$|\$|CAD)?\s*([\d,\.]+(?:\s*[kKmM]|(?:\s*(?:million|thousand)))?)')
+VALUE_LOOKAHEAD = 3  # text runs after a bare label that may hold its value ("Listing Price" | "$1.2M")
+MULTI = object()     # marks a subtree that links to more than one listing
+
+def _is_listing(u):
+    return bool(u) and "/listings/" in u and not u.rstrip("/").endswith("/listings")
 
-            title = a.text(strip=True) or (tile.css_first("h2,h3") and tile.css_first("h2,h3").text(strip=True)) or "View Listing"
-            ask_from_tile, app_from_tile = _extract_label_value_in_tile(tile)
+def _money_in(text: str, start=0):
+    m = RX_MONEY.search(text, start)
+    v = _to_num_money(m.group(1)) if m else None
+    return v if v and v >= 100_000 else None
 
-            rows.append((u, title, ask_from_tile, app_from_tile))
-            seen.add(u)
-            found_any = True
+def archive_tiles(html, page_url, seen=None):
+    """[(url, title, ask_from_tile, app_from_tile)] for the listing tiles on one archive page.
 
-        if not found_any:
-            break
+    One pre-order walk records each node's parent, listing links, headings and
+    text runs. Links are folded bottom-up to find which single listing (if
+    any) each subtree belongs to; a listing's tile is the outermost
+    TILE_SELECTORS element owned by it alone (any element, on pages without
+    those classes). Text runs are then read once, in document order, against
+    the tile they fall in: a price/appraisal label takes the money in the rest
+    of its run or in one of the next VALUE_LOOKAHEAD runs. Linear in page size.
+    URLs in `seen` are skipped and new ones added to it. `html` may also be
+    a page already parsed with HTMLParser.
+    """
+    seen = set() if seen is None else seen
+    root = html if isinstance(html, HTMLParser) else HTMLParser(html)
+    top = root.root
+    if top is None:
+        return []
+    classed = {n.mem_id for sel in TILE_SELECTORS for n in root.css(sel)}
+
+    index, parent, is_tile_class = {}, [], []
+    links, texts, firsts = {}, [], {}  # firsts: node index -> listing anchor / heading
+    for i, node in enumerate(top.traverse(include_text=True)):
+        index[node.mem_id] = i
+        up = node.parent
+        parent.append(index.get(up.mem_id, -1) if up is not None else -1)
+        is_tile_class.append(node.mem_id in classed)
+        tag = node.tag
+        if tag == "-text":
+            texts.append((i, node.text(deep=False)))
+        elif tag == "a":
+            u = absolute_link(page_url, node.attributes.get("href") or "")
+            if _is_listing(u):
+                links[i] = u
+                firsts[i] = node
+        elif tag in ("h2", "h3"):
+            firsts[i] = node
+
+    # bottom-up (pre-order puts children after their parent): the one listing a subtree links to
+    owner = [None] * len(parent)
+    for i, u in links.items():
+        owner[i] = u
+    for i in range(len(parent) - 1, -1, -1):
+        u, p = owner[i], parent[i]
+        if u is not None and p >= 0:
+            owner[p] = u if owner[p] in (None, u) else MULTI
+
+    # top-down: each node's tile root (-1 outside every tile)
+    tile = [-1] * len(parent)
+    for i, p in enumerate(parent):
+        if p >= 0 and tile[p] >= 0:
+            tile[i] = tile[p]
+        elif isinstance(owner[i], str) and (is_tile_class[i] if classed else p < 0 or owner[p] is MULTI):
+            tile[i] = i
 
+    titles, headings = {}, {}
+    for i, node in firsts.items():
+        t = tile[i]
+        if t < 0:
+            continue
+        if node.tag == "a":
+            if not titles.get(t):
+                titles[t] = node.text(strip=True)
+        elif t not in headings:
+            headings[t] = node.text(strip=True)
+
+    ask, app, pending = {}, {}, {}  # pending: tile -> (which, runs left) after a bare label
+    for i, raw in texts:
+        t = tile[i]
+        text = raw.strip()
+        if t < 0 or not text:
+            continue
+        labelled = False
+        for found, rx in ((app, RX_APPRAISED), (ask, RX_LISTING_PRICE)):
+            m = rx.search(text)
+            if m is None:
+                continue
+            labelled = True
+            if t not in found:
+                v = _money_in(text, m.end())
+                if v:
+                    found[t] = v
+                else:
+                    pending[t] = (found, VALUE_LOOKAHEAD)
+        if labelled or t not in pending:
+            continue
+        found, left = pending.pop(t)
+        v = _money_in(text)
+        if v:
+            found.setdefault(t, v)
+        elif left > 1:
+            pending[t] = (found, left - 1)
+
+    rows = []
+    for t in sorted(set(tile) - {-1}):
+        u = owner[t]
+        if u in seen:
+            continue
+        seen.add(u)
+        rows.append((u, titles.get(t) or headings.get(t) or "View Listing", ask.get(t), app.get(t)))
     return rows
 
+def _page_url(n: int) -> str:
+    return ARCHIVE if n == 1 else f"{ARCHIVE}page/{n}/"
+
+class TileState:
+    """Archive tiles from the last good run, persisted in data/tierthree_tiles.json.
+
+    Incremental runs stop paginating at the first page of known listings and
+    carry the rest of the tiles over from here; a full crawl is forced once
+    the last one is FULL_CRAWL_EVERY_S old, so delisted practices drop out.
+    Archive replays start empty and never commit (as SitemapState).
+    """
+
+    def __init__(self, path=TILES_JSON):
+        self.path = path
+        data = {} if ARCHIVE_STORE.replaying else self._read()
+        self.tiles = [tuple(t) for t in data.get("tiles", [])]
+        self.full_at = data.get("full_at")
+
+    def _read(self) -> dict:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    @property
+    def urls(self) -> set:
+        return {t[0] for t in self.tiles}
+
+    def needs_full_crawl(self) -> bool:
+        if not self.full_at:
+            return True
+        age = datetime.now(timezone.utc) - datetime.fromisoformat(self.full_at)
+        return age.total_seconds() > FULL_CRAWL_EVERY_S
+
+    def commit(self, tiles, full: bool):
+        if ARCHIVE_STORE.replaying:
+            return
+        check_cancelled()
+        self.tiles = list(tiles)
+        if full:
+            self.full_at = datetime.now(timezone.utc).isoformat()
+        self.path.parent.mkdir(exist_ok=True)
+        self.path.write_text(json.dumps({"full_at": self.full_at, "tiles": self.tiles}), encoding="utf-8")
+
+def _collect_archive_tiles(max_pages=20, state=None, incremental=True):
+    """Return (tiles, complete): tiles as (url, title, ask_from_tile, app_from_tile).
+
+    Pages render concurrently up to the last page the pagination widget
+    shows. Incrementally, the crawl stops at the first page holding only
+    listings from the last run (`state`). Whenever the crawl is not complete
+    (early stop, or a page failed to render) the last run's other tiles are
+    carried over.
+    """
+    seen = set()
+    crawl = paginate(_page_url, lambda doc, url: archive_tiles(doc, url, seen), max_pages=max_pages,
+                     known=state.urls if state and incremental else None, readiness=ARCHIVE_READINESS)
+    if crawl.failed:
+        print(f"[SCRAPER] TierThree archive: page(s) {crawl.failed} failed to render")
+    tiles = list(crawl.items)
+    if state and not crawl.complete:
+        tiles += [t for t in state.tiles if t[0] not in seen]
+    print(f"[SCRAPER] TierThree archive: {crawl.pages} page(s) rendered of {crawl.last_page or '?'}, "
+          f"{len(crawl.items)} tiles read, {len(tiles)} total")
+    return tiles, crawl.complete
+
 def _prov_from_url(url: str):
     m = re.search(r'/listings/([a-z]{2})\d+/?$', url, re.I)
     if not m:
@@ -115,22 +226,28 @@ def _prov_from_url(url: str):
     code = m.group(1).upper()
     return code if code in ("ON","BC","AB","SK","MB","NB","NS","NL","PE","YT","NT","NU") else ""
 
-def scrape():
-    tiles = _collect_archive_tiles(max_pages=20)  # (url, title, ask_from_tile, app_from_tile)
+def scrape(incremental=True):
+    state = TileState()
+    if incremental and state.needs_full_crawl():
+        incremental = False
+    # (url, title, ask_from_tile, app_from_tile)
+    tiles, complete = _collect_archive_tiles(max_pages=20, state=state, incremental=incremental)
     if not tiles:
         return []
+    if complete or incremental:  # a broken full crawl keeps the previous state
+        state.commit(tiles, full=complete and not incremental)
+
+    tiles = tiles[:120]
+    urls = [t[0] for t in tiles]
+    parsed = fetch_parsed(urls, parse_tierthree_detail, REQUIRED_FIELDS, "body",
+                          readiness=DETAIL_READINESS, resources=DETAIL_RESOURCES,
+                          known=wp_listing_fields(urls, parse_tierthree_detail))
 
     rows = []
-    for url, title, ask_from_tile, appr_from_tile in tiles[:120]:
+    for (url, title, ask_from_tile, appr_from_tile), fields in zip(tiles, parsed):
         province = _prov_from_url(url)
-
-        # Enrich from detail page
-        try:
-            html = fetch_dynamic(url, "body")
-            fields = parse_tierthree_detail(html, url=url)
-        except Exception as e:
-            print(f"[SCRAPER] TierThree detail fail: {url} -> {e}")
-            fields = {}
+        # Enrich from detail page (empty when neither tier could load it)
+        fields = fields or {}
 
         # Normalize: treat appraised value as asking price if none
         effective_price = fields.get("asking_price") or ask_from_tile or appr_from_tile
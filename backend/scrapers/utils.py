@@ -1,18 +1,246 @@
-import re, time, httpx
+import re, time, httpx, asyncio, inspect, threading, contextvars
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from urllib.parse import urljoin, urlparse
 from selectolax.parser import HTMLParser
 
+DATA_DIR = Path(__file__).parent.parent / "data"
+
 DEFAULT_HEADERS = {
     "User-Agent": "RootedBot/1.0 (+https://rooted.ai) contact: dev@rooted.ai"
 }
 
+try:
+    import h2  # noqa: F401  (httpx only negotiates HTTP/2 when h2 is installed)
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+POOL_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=30)
+PER_HOST_CONCURRENCY = 4
+MAX_ATTEMPTS = 3  # a 429/503 is retried once the host's limiter lets us back in
+HEDGE_S = 2.0      # fetch_first_ok starts the next candidate after this long without an answer
+
+_client = None
+_client_lock = threading.Lock()
+
+class BrokerCancelled(BaseException):
+    """The broker's run was abandoned (deadline passed).
+
+    A BaseException, like asyncio.CancelledError, so the per-URL
+    `except Exception` handlers in the fetch loops let it through.
+    """
+
+_cancel_event = contextvars.ContextVar("broker_cancel_event", default=None)
+
+def bind_cancel_event(event: threading.Event):
+    """Make `event` the current broker's cancel flag (inherited by its asyncio tasks and to_thread calls)."""
+    _cancel_event.set(event)
+
+def check_cancelled():
+    """Raise BrokerCancelled if the current broker has been told to stop."""
+    event = _cancel_event.get()
+    if event is not None and event.is_set():
+        raise BrokerCancelled("broker cancelled after its deadline")
+
+def submit_to_loop(loop, coro):
+    """Schedule `coro` on another thread's event loop -> concurrent Future.
+
+    The caller's broker cancel flag goes with it, so check_cancelled() keeps
+    working inside the coroutine.
+    """
+    event = _cancel_event.get()
+    async def bound():
+        if event is not None:
+            bind_cancel_event(event)
+        return await coro
+    return asyncio.run_coroutine_threadsafe(bound(), loop)
+
+def get_client() -> httpx.Client:
+    """Process-wide pooled client, so repeat requests to a host reuse the TCP/TLS connection."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(headers=DEFAULT_HEADERS, timeout=30, follow_redirects=True,
+                                       http2=HTTP2, limits=POOL_LIMITS)
+    return _client
+
+def run_sync(coro):
+    """asyncio.run that also works when the caller is already inside an event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        return ex.submit(contextvars.copy_context().run, asyncio.run, coro).result()
+
 def fetch_html(url: str, timeout=30) -> str:
-    with httpx.Client(headers=DEFAULT_HEADERS, timeout=timeout, follow_redirects=True) as c:
-        r = c.get(url)
-        r.raise_for_status()
+    from .archive import ARCHIVE
+    if ARCHIVE.replaying:
+        r = ARCHIVE.response(url)
+        if r is None:
+            raise LookupError(f"not in archive: {url}")
         return r.text
+    from .ratelimit import LIMITER, THROTTLE_STATUSES
+    from .breaker import BREAKER
+    check_cancelled()
+    BREAKER.check(url)
+    if not LIMITER.allowed(url):
+        raise PermissionError(f"disallowed by robots.txt: {url}")
+    for _ in range(MAX_ATTEMPTS):
+        LIMITER.acquire(url)
+        check_cancelled()
+        t0 = time.monotonic()
+        try:
+            r = get_client().get(url, timeout=timeout)
+        except Exception as e:
+            LIMITER.record(url, None, time.monotonic() - t0)
+            BREAKER.record(url, error=e)
+            raise
+        LIMITER.record(url, r.status_code, time.monotonic() - t0, r.headers.get("retry-after"))
+        if r.status_code not in THROTTLE_STATUSES:
+            break
+    BREAKER.record(url, r.status_code)
+    r.raise_for_status()
+    ARCHIVE.put(url, "static", r.content, r.headers.get("content-type", ""))
+    return r.text
+
+def _async_client(timeout) -> httpx.AsyncClient:
+    return httpx.AsyncClient(headers=DEFAULT_HEADERS, timeout=timeout, follow_redirects=True,
+                             http2=HTTP2, limits=POOL_LIMITS)
+
+async def _polite_get(c, url, headers=None):
+    """GET through the host's circuit breaker, robots.txt rules and rate limiter.
 
-def fetch_first_ok(candidates, timeout=30):
+    Throttled answers (429/503) are retried up to MAX_ATTEMPTS; the response
+    is returned without raise_for_status so callers can handle 304s.
+    """
+    from .ratelimit import LIMITER, THROTTLE_STATUSES
+    from .breaker import BREAKER
+    check_cancelled()
+    BREAKER.check(url)
+    if not await asyncio.to_thread(LIMITER.allowed, url):
+        raise PermissionError("disallowed by robots.txt")
+    for _ in range(MAX_ATTEMPTS):
+        await LIMITER.acquire_async(url)
+        check_cancelled()
+        t0 = time.monotonic()
+        try:
+            r = await c.get(url, headers=headers)
+        except Exception as e:
+            LIMITER.record(url, None, time.monotonic() - t0)
+            BREAKER.record(url, error=e)
+            raise
+        LIMITER.record(url, r.status_code, time.monotonic() - t0, r.headers.get("retry-after"))
+        if r.status_code not in THROTTLE_STATUSES:
+            break
+    BREAKER.record(url, r.status_code)
+    return r
+
+async def _notify(callback, i, result):
+    """Call a per-result callback; a coroutine callback is awaited (its way to push back on the fetchers)."""
+    done = callback(i, result)
+    if inspect.isawaitable(done):
+        await done
+
+async def _fetch_many(urls, per_host, timeout, extra_headers, on_response=None):
+    from .archive import ARCHIVE
+    if ARCHIVE.replaying:
+        out = []
+        for i, u in enumerate(urls):
+            r = ARCHIVE.response(u)
+            if r is None:
+                print(f"[SCRAPER] FAIL: {u} -> not in archive")
+            if on_response is not None:
+                await _notify(on_response, i, r)
+            out.append(r)
+        return out
+    sems = {}
+    async with _async_client(timeout) as c:
+        async def one(i, u):
+            sem = sems.setdefault(hostname(u), asyncio.Semaphore(per_host))
+            async with sem:
+                try:
+                    r = await _polite_get(c, u, extra_headers.get(u))
+                    if r.status_code != 304:  # 304 answers a conditional GET; callers handle it
+                        r.raise_for_status()
+                        ARCHIVE.put(u, "static", r.content, r.headers.get("content-type", ""))
+                except Exception as e:
+                    print(f"[SCRAPER] FAIL: {u} -> {e}")
+                    r = None
+            if on_response is not None:
+                await _notify(on_response, i, r)
+            return r
+        return await asyncio.gather(*(one(i, u) for i, u in enumerate(urls)))
+
+def fetch_many_responses(urls, per_host=PER_HOST_CONCURRENCY, timeout=30, extra_headers=None, on_response=None):
+    """Fetch URLs concurrently, at most `per_host` in flight per host.
+
+    Returns the httpx.Response objects in input order, with None for URLs that failed.
+
+    `extra_headers` maps URL -> headers for that request (e.g. conditional GET validators).
+    `on_response(index, response)` is called as each request finishes, so work
+    can start before the slowest page lands. It runs on the event loop: a
+    coroutine function is awaited, so it must not block.
+    """
+    urls = list(urls)
+    if not urls:
+        return []
+    return run_sync(_fetch_many(urls, per_host, timeout, extra_headers or {}, on_response))
+
+async def _race_first_ok(candidates, timeout, hedge_s):
+    """First candidate to answer 2xx wins; the next one starts when the previous
+    fails or has been in flight for `hedge_s` seconds. Losers are cancelled."""
+    from .archive import ARCHIVE
+    errors = []
+    async with _async_client(timeout) as c:
+        async def attempt(u):
+            try:
+                r = await _polite_get(c, u)
+                r.raise_for_status()
+                return u, r, None
+            except Exception as e:
+                return u, None, e
+
+        todo, pending = list(candidates), set()
+        try:
+            while todo or pending:
+                if todo:
+                    pending.add(asyncio.create_task(attempt(todo.pop(0))))
+                done, pending = await asyncio.wait(pending, timeout=hedge_s if todo else None,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    u, r, err = task.result()
+                    if err is None:
+                        ARCHIVE.put(u, "static", r.content, r.headers.get("content-type", ""))
+                        return r.text, u, errors
+                    print(f"[SCRAPER] FAIL: {u} -> {err}")
+                    errors.append(err)
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+    return None, None, errors
+
+def fetch_first_ok(candidates, timeout=30, hedge_s=HEDGE_S):
+    """(html, url) from the first candidate URL that answers 2xx.
+
+    Candidates are raced in order, each new one starting `hedge_s` seconds
+    after the previous (or as soon as it fails), so a dead URL costs at most
+    `hedge_s` instead of the full timeout. hedge_s=0 fires them all at once;
+    hedge_s=None tries them strictly one after another.
+    """
+    candidates = list(candidates)
+    if not candidates:
+        raise RuntimeError("No candidates provided")
+    from .archive import ARCHIVE
+    if hedge_s is not None and not ARCHIVE.replaying:
+        html, used, errors = run_sync(_race_first_ok(candidates, timeout, hedge_s))
+        if used is not None:
+            print(f"[SCRAPER] OK: {used}")
+            return html, used
+        raise errors[-1]
     last_err = None
     for u in candidates:
         try:
@@ -23,9 +251,7 @@ def fetch_first_ok(candidates, timeout=30):
             last_err = e
             print(f"[SCRAPER] FAIL: {u} -> {e}")
             continue
-    if last_err:
-        raise last_err
-    raise RuntimeError("No candidates provided")
+    raise last_err
 
 def parse_number(s: str):
     if not s: return None
@@ -52,18 +278,6 @@ def hostname(u: str):
         return ""
 
 def fetch_sitemap_urls(base_sitemap_urls):
-    """Return list of URLs from one or more sitemap.xml endpoints."""
-    out = []
-    with httpx.Client(headers=DEFAULT_HEADERS, timeout=30, follow_redirects=True) as c:
-        for sm in base_sitemap_urls:
-            try:
-                r = c.get(sm)
-                r.raise_for_status()
-                # naive extraction of <loc>...</loc>
-                locs = re.findall(r"<loc>(.*?)</loc>", r.text, flags=re.IGNORECASE)
-                out.extend(locs)
-                print(f"[SCRAPER] sitemap OK: {sm} -> {len(locs)} urls")
-            except Exception as e:
-                print(f"[SCRAPER] sitemap FAIL: {sm} -> {e}")
-                continue
-    return out
+    """Return list of URLs from one or more sitemap.xml endpoints (nested indexes are followed)."""
+    from .sitemap import fetch_sitemap_entries
+    return [u for u, _ in fetch_sitemap_entries(base_sitemap_urls)]
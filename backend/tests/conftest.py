@@ -0,0 +1,26 @@
+import functools, http.server, threading
+
+import pytest
+
+from scrapers.archive import ARCHIVE
+from scrapers.breaker import BREAKER
+
+PAGE = "<html><body><h1>Practice</h1><dl><dt>Asking price</dt><dd>$1,200,000</dd></dl></body></html>"
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch):
+    monkeypatch.setattr(BREAKER, "path", tmp_path / "host_health.json")
+    monkeypatch.setattr(BREAKER, "_hosts", {})
+    monkeypatch.setattr(ARCHIVE, "root", tmp_path / "archive")
+    monkeypatch.setattr(ARCHIVE, "_latest", None)
+
+@pytest.fixture
+def static_server(tmp_path):
+    (tmp_path / "listing.html").write_text(PAGE, encoding="utf-8")
+    (tmp_path / "robots.txt").write_text("User-agent: *\nAllow: /\n", encoding="utf-8")
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=str(tmp_path))
+    handler.log_message = lambda *a: None
+    srv = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_port}"
+    srv.shutdown()
@@ -0,0 +1,26 @@
+import httpx
+import pytest
+
+from scrapers.breaker import CircuitBreaker, CircuitOpen, FAILURE_THRESHOLD, is_host_failure
+
+@pytest.mark.parametrize("error, down", [
+    (httpx.ConnectError("refused"), True),
+    (TimeoutError("read timed out"), True),
+    (RuntimeError("net::ERR_CONNECTION_REFUSED at https://example.com/"), True),
+    (RuntimeError("net::ERR_NAME_NOT_RESOLVED at https://example.com/"), True),
+    (RuntimeError("net::ERR_ABORTED at https://example.com/"), False),
+    (RuntimeError("Timeout 20000ms exceeded."), False),
+    (CircuitOpen("example.com skipped"), False),
+])
+def test_error_classification(error, down):
+    assert is_host_failure(error=error) is down
+
+def test_render_aborts_never_open_the_circuit(tmp_path):
+    breaker = CircuitBreaker(tmp_path / "host_health.json")
+    url = "https://example.com/listing"
+    for _ in range(FAILURE_THRESHOLD + 1):
+        breaker.record(url, error=RuntimeError("net::ERR_ABORTED at " + url))
+    assert breaker.allow(url)
+    for _ in range(FAILURE_THRESHOLD):
+        breaker.record(url, error=RuntimeError("net::ERR_CONNECTION_RESET at " + url))
+    assert not breaker.allow(url)
@@ -0,0 +1,142 @@
+import asyncio, threading
+
+import pytest
+
+from scrapers import browser
+from scrapers.browser import BrowserPool, SharedBrowser
+
+class FakeContext:
+    async def close(self):
+        pass
+
+class FakePage:
+    context = FakeContext()
+
+    async def goto(self, url, **kw):
+        raise RuntimeError("net::ERR_ABORTED")
+
+def _fake_pool(size, monkeypatch):
+    pool = BrowserPool(size=size)
+    pool._pages = asyncio.Queue()
+    for _ in range(size):
+        page = FakePage()
+        pool._blocked[page] = {"requests": 0, "bytes": 0}
+        pool._pages.put_nowait(page)
+    pool._live = size
+
+    async def broken_new_page():
+        raise RuntimeError("browser is gone")
+    monkeypatch.setattr(pool, "_new_page", broken_new_page)
+    return pool
+
+def test_failed_replacement_is_not_returned_to_the_pool(static_server, monkeypatch):
+    async def run():
+        pool = _fake_pool(2, monkeypatch)
+        with pytest.raises(RuntimeError, match="ERR_ABORTED"):
+            await pool.fetch(static_server + "/listing.html")
+        # the closed page was dropped, not queued again
+        assert pool._live == 1 and pool._pages.qsize() == 1
+        with pytest.raises(RuntimeError, match="ERR_ABORTED"):
+            await pool.fetch(static_server + "/listing.html")
+        # last slot gone: later fetches fail fast instead of hanging on the queue
+        with pytest.raises(RuntimeError, match="no usable pages"):
+            await asyncio.wait_for(pool.fetch(static_server + "/listing.html"), 5)
+    asyncio.run(run())
+
+class FakeResponse:
+    status = 200
+    headers = {}
+
+class FakeBrowser:
+    """Just enough of Playwright for the pool: pages answer goto/content without a real Chromium."""
+    launches = 0
+
+    def __init__(self):
+        FakeBrowser.launches += 1
+        self.connected = True
+
+    async def new_context(self, **kw):
+        class Context:
+            async def new_page(self):
+                page = FakeRenderPage()
+                page.context = self
+                return page
+
+            async def route(self, pattern, handler):
+                pass
+
+            async def close(self):
+                pass
+        return Context()
+
+    def is_connected(self):
+        return self.connected
+
+    async def close(self):
+        self.connected = False
+
+class FakeRenderPage:
+    async def goto(self, url, **kw):
+        self.url = url
+        return FakeResponse()
+
+    async def wait_for_load_state(self, state, timeout=None):
+        pass
+
+    async def evaluate(self, js, arg=None):
+        return True
+
+    async def content(self):
+        return f"<html><body>{self.url}</body></html>"
+
+class FakePlaywright:
+    class chromium:
+        @staticmethod
+        async def launch(**kw):
+            return FakeBrowser()
+
+    async def start(self):
+        return self
+
+    async def stop(self):
+        pass
+
+def test_one_browser_serves_every_render_until_closed(static_server, monkeypatch):
+    monkeypatch.setattr(browser, "async_playwright", FakePlaywright)
+    monkeypatch.setattr(browser, "SHARED_BROWSER", SharedBrowser(size=2))
+    monkeypatch.setattr(FakeBrowser, "launches", 0)
+    urls = [f"{static_server}/listing.html?p={i}" for i in range(3)]
+
+    out = {}
+    def broker(name):
+        out[name] = browser.render_many(urls, "body", concurrency=2)
+    threads = [threading.Thread(target=broker, args=(n,)) for n in ("a", "b")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert browser.fetch_dynamic(urls[0], "body").endswith(f"{urls[0]}</body></html>")
+    assert all(urls[2] in htmls[2] for htmls in out.values())
+    assert FakeBrowser.launches == 1
+
+    browser.SHARED_BROWSER.close()
+    browser.render_many(urls[:1], "body")  # next run starts a new browser
+    assert FakeBrowser.launches == 2
+    browser.SHARED_BROWSER.close()
+
+def _chromium_available():
+    async def probe():
+        async with BrowserPool(size=1):
+            pass
+    try:
+        asyncio.run(probe())
+        return True
+    except Exception:
+        return False
+
+@pytest.mark.skipif(not _chromium_available(), reason="Chromium is not installed")
+def test_renders_from_local_static_server(static_server):
+    html = browser.fetch_dynamic(static_server + "/listing.html", "dl")
+    assert "$1,200,000" in html
+    htmls = browser.render_many([static_server + "/listing.html", static_server + "/missing.html"], "body")
+    assert "$1,200,000" in htmls[0]
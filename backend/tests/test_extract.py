@@ -0,0 +1,16 @@
+from scrapers.adapters_roi import parse_roi_detail
+from scrapers.generic_detail import extract_fields_from_html
+
+def test_value_is_not_taken_across_another_label():
+    html = ("<html><body><p>Asking Price: Contact broker</p><p>Gross Billings $1,600,000</p>"
+            "<p>Cash flow $420,000</p></body></html>")
+    fields = parse_roi_detail(html)
+    assert fields["asking_price"] is None
+    assert fields["collections"] == 1_600_000
+
+def test_values_next_to_their_labels_still_resolve():
+    fields = extract_fields_from_html("<p>Price: $850,000. Revenue: $1,200,000. 1,400 sq ft, 6 operatories</p>")
+    assert fields["asking_price"] == 850_000
+    assert fields["collections"] == 1_200_000
+    assert fields["sqft"] == 1_400
+    assert fields["equipped_ops"] == 6
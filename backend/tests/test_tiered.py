@@ -0,0 +1,34 @@
+import pytest
+
+from scrapers import tiered
+from scrapers.generic_detail import extract_fields_from_html
+from scrapers.httpcache import ResponseCache
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(tiered, "TIERS_JSON", tmp_path / "fetch_tiers.json")
+    return ResponseCache(tmp_path / "http_cache.json")
+
+@pytest.fixture
+def no_browser(monkeypatch):
+    # every render fails, as when Chromium is missing or the page times out
+    def render_many(urls, *a, on_result=None, **kw):
+        return [None for _ in urls]
+    monkeypatch.setattr(tiered, "render_many", render_many)
+
+def test_not_modified_reuses_stored_fields(static_server, cache, no_browser):
+    url = static_server + "/listing.html"
+    first = tiered.fetch_parsed([url], extract_fields_from_html, required=("asking_price",), cache=cache)
+    assert first[0]["asking_price"] == 1_200_000
+    # second run sends If-Modified-Since and gets a 304: no render needed
+    again = tiered.fetch_parsed([url], extract_fields_from_html, required=("asking_price",), cache=cache)
+    assert again == first
+    assert cache.stats["not_modified"] == 1
+
+def test_incomplete_page_is_not_cached_when_its_render_fails(static_server, tmp_path, cache, no_browser):
+    (tmp_path / "teaser.html").write_text("<html><body><h1>Practice for sale</h1></body></html>", encoding="utf-8")
+    url = static_server + "/teaser.html"
+    fields = tiered.fetch_parsed([url], extract_fields_from_html, required=("asking_price",), cache=cache)
+    assert fields[0] is not None and fields[0]["asking_price"] is None
+    # nothing stored, so the next run renders again instead of reusing the partial fields
+    assert url not in cache.entries